@@ -0,0 +1,151 @@
+import os
+
+import cv2
+import numpy as np
+
+import common_path  # noqa: F401
+from detection import PROXY_MAX_SIDE, find_document_quad_proxy, find_quad_in_edges, warp_document
+from profiling import profiled
+
+
+def detect_quad(img, proxy=True, on_step=None):
+    # Belge köşelerini bul. on_step verilirse gri/blur/kenar adımları da üretilir
+    # (proxy modunda küçük görüntü üzerinde); verilmezse hiçbir ara görüntü saklanmaz.
+    if on_step is None:
+        if proxy:
+            return find_document_quad_proxy(img)
+        preview = img
+    else:
+        scale = max(img.shape[:2]) / float(PROXY_MAX_SIDE)
+        preview = img
+        if proxy and scale > 1:
+            preview = cv2.resize(img, None, fx=1 / scale, fy=1 / scale, interpolation=cv2.INTER_AREA)
+
+    # 2. Griye çeviriyoruz
+    gray = cv2.cvtColor(preview, cv2.COLOR_BGR2GRAY)
+    # 3. Blur uyguluyoruz
+    blur = cv2.GaussianBlur(gray, (5, 5), 0)
+    # 4. (Canny) Kenar buluyoruz
+    edges = cv2.Canny(blur, 75, 200)
+    if on_step is not None:
+        on_step(gray, "step_1_gray.jpg", "Adım 1: Gri Görüntü")
+        on_step(blur, "step_2_blur.jpg", "Adım 2: Gaussian Blur")
+        on_step(edges, "step_3_edges.jpg", "Adım 3: Kenar Tespiti (Canny)")
+
+    if proxy:
+        return find_document_quad_proxy(img)
+    # 5. Kontur buluyoruz
+    doc_cnt = find_quad_in_edges(edges)
+    return None if doc_cnt is None else doc_cnt.reshape(4, 2).astype("float32")
+
+
+def quad_contour(corners):
+    return corners.reshape(4, 1, 2).round().astype(np.int32)
+
+
+def draw_quad(img, corners):
+    # Belge kenarlarını orijinal görüntü üzerinde yeşil border çiziyoruz
+    img_with_contour = img.copy()
+    cv2.drawContours(img_with_contour, [quad_contour(corners)], -1, (0, 255, 0), 5)  # yeşil çizgi
+    return img_with_contour
+
+
+def mask_document(img, corners):
+    # Belge dışındaki alanı siyaha boya
+    mask = np.zeros(img.shape[:2], dtype=np.uint8)
+    cv2.drawContours(mask, [quad_contour(corners)], -1, 255, -1)
+    return cv2.bitwise_and(img, img, mask=mask)
+
+
+def crop_document(img, corners):
+    # Belge bölgesini sınırlayıcı kutuya göre kırp
+    x, y, w, h = cv2.boundingRect(quad_contour(corners))
+    return img[y:y+h, x:x+w]
+
+
+@profiled()
+def enhance_contrast(img):
+    # Griye çevirme ve CLAHE ile kontrast artırma
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+    return clahe.apply(gray)
+
+
+@profiled()
+def binarize(gray):
+    # Adaptive threshold ile arka planı beyazlatıyoruz
+    return cv2.adaptiveThreshold(
+        gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+        cv2.THRESH_BINARY, 11, 2
+    )
+
+
+def save_steps(debug_dir):
+    # Ara adımları debug_dir klasörüne JPEG olarak yazan on_step geri çağrısı
+    os.makedirs(debug_dir, exist_ok=True)
+
+    def on_step(img, name, winname):
+        cv2.imwrite(os.path.join(debug_dir, name), img)
+    return on_step
+
+
+# Üretim modu aşamaları: ad -> (bağımlılıklar, hesaplama). CLAHE ve eşikleme
+# tam kare yerine düzeltilmiş (daha küçük) sayfa üzerinde çalışır.
+STAGES = {
+    "corners": (("image",), lambda image, proxy: _require_corners(detect_quad(image, proxy))),
+    "warped": (("image", "corners"), lambda image, corners, proxy: warp_document(image, corners)),
+    "gray": (("warped",), lambda warped, proxy: cv2.cvtColor(warped, cv2.COLOR_BGR2GRAY)),
+    "contrast": (("gray",), lambda gray, proxy: enhance_contrast(gray)),
+    "binary": (("contrast",), lambda contrast, proxy: binarize(contrast)),
+}
+
+
+def _require_corners(corners):
+    if corners is None:
+        raise ValueError("Belge konturu bulunamadı!")
+    return corners
+
+
+def run_stages(img, outputs=("warped",), proxy=True, known=None):
+    # Yalnızca istenen çıktıların bağımlı olduğu aşamaları çalıştırır; kullanılmayan
+    # dallar hiç hesaplanmaz. Ör. ("warped",) yalnızca köşe + warp, ("binary",)
+    # ise warp -> gri -> CLAHE -> eşikleme zincirini çalıştırır. known ile önceden
+    # hesaplanmış aşamalar (ör. köşeler) verilebilir.
+    results = {"image": img}
+    results.update(known or {})
+
+    def resolve(name):
+        if name not in results:
+            if name not in STAGES:
+                raise ValueError(f"Bilinmeyen aşama: {name}")
+            deps, compute = STAGES[name]
+            results[name] = compute(*[resolve(dep) for dep in deps], proxy)
+        return results[name]
+
+    return {name: resolve(name) for name in outputs}
+
+
+def scan_document(img, proxy=True, debug_dir=None, on_step=None, output="warped"):
+    # Belgeyi bulup perspektifini düzeltir ve istenen çıktıyı döndürür:
+    # "warped" (renkli sayfa), "gray", "contrast" (CLAHE) veya "binary" (eşikli).
+    # Hızlı yolda yalnızca çıktının gerektirdiği aşamalar çalışır; maske, kırpma
+    # ve ara adım görüntüleri sadece debug_dir/on_step verildiğinde üretilir.
+    if on_step is None and debug_dir is not None:
+        on_step = save_steps(debug_dir)
+    if on_step is None:
+        return run_stages(img, (output,), proxy)[output]
+
+    corners = _require_corners(detect_quad(img, proxy, on_step))
+
+    on_step(draw_quad(img, corners), "step_3.5_green_contour.jpg", "Adım 3.5: Belge Kenarları (Yeşil Çizgi)")
+    masked = mask_document(img, corners)
+    on_step(masked, "step_4_masked.jpg", "Adım 4: Maskeli Görüntü")
+    cropped = crop_document(masked, corners)
+    on_step(cropped, "step_5_cropped.jpg", "Adım 5: Kırpılmış Görüntü")
+    contrast_img = enhance_contrast(cropped)
+    on_step(contrast_img, "step_6_contrast.jpg", "Adım 6: Kontrast Artırılmış Görüntü")
+    on_step(binarize(contrast_img), "step_7_thresh.jpg", "Adım 7: Adaptive Threshold (Beyaz Zemin)")
+
+    results = run_stages(img, ("warped", output), proxy, known={"corners": corners})
+    on_step(results["warped"], "output_warped.jpg", "Adım 8: Perspektif Düzeltme (Sonuç)")
+    return results[output]
@@ -0,0 +1,264 @@
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+import numpy as np
+
+import common_path  # noqa: F401
+import profiling
+from scanner import scan_document
+
+OUTPUTS = ("warped", "gray", "contrast", "binary")
+ENCODINGS = {"png": (".png", "image/png"), "jpg": (".jpg", "image/jpeg"), "jpeg": (".jpg", "image/jpeg")}
+
+# Gecikme yüzdelikleri için saklanan son ölçüm sayısı
+LATENCY_WINDOW = 10000
+
+# Kabul edilen en büyük istek gövdesi (bayt); büyük gövdeler okunmadan 413 ile reddedilir
+MAX_BODY_BYTES = 50 * 1024 * 1024
+
+
+class ScanService:
+    # Sınırlı kuyruk + iş parçacığı havuzu. OpenCV ağır işlemlerde GIL'i bıraktığı
+    # için iş parçacıkları gerçekten paralel çalışır. Kuyruk doluysa iş reddedilir
+    # (geri basınç); istemci 503 alır ve daha sonra tekrar dener.
+
+    def __init__(self, workers=4, queue_size=16, proxy=True):
+        self.proxy = proxy
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.waits = deque(maxlen=LATENCY_WINDOW)
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def accepting(self):
+        # Gövde okunmadan önceki kontrol: kuyruk doluysa istek reddedilir ve
+        # reddedilenler sayacına eklenir. submit yine de kesin karar verir.
+        if not self.jobs.full():
+            return True
+        with self.lock:
+            self.rejected += 1
+        return False
+
+    def submit(self, data, fmt="png", output="warped"):
+        # Kuyruk doluysa None döner
+        future = Future()
+        try:
+            self.jobs.put_nowait((data, fmt, output, future, time.perf_counter()))
+        except queue.Full:
+            with self.lock:
+                self.rejected += 1
+            return None
+        return future
+
+    def cancel(self, future):
+        # Süresi dolan iş: henüz başlamadıysa hiç işlenmez, başladıysa sonucu atılır
+        future.cancel()
+        with self.lock:
+            self.timed_out += 1
+
+    def _worker(self):
+        while True:
+            data, fmt, output, future, queued_at = self.jobs.get()
+            if not future.set_running_or_notify_cancel():
+                self.jobs.task_done()
+                continue
+            started = time.perf_counter()
+            with self.lock:
+                self.in_flight += 1
+            try:
+                future.set_result(self._process(data, fmt, output))
+                ok = True
+            except Exception as e:
+                future.set_exception(e)
+                ok = False
+            finished = time.perf_counter()
+            with self.lock:
+                self.in_flight -= 1
+                self.waits.append(started - queued_at)
+                self.latencies.append(finished - queued_at)
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            self.jobs.task_done()
+
+    def _process(self, data, fmt, output):
+        with profiling.stage("imdecode"):
+            img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError("Görsel çözülemedi!")
+        page = scan_document(img, proxy=self.proxy, output=output)
+        with profiling.stage("imencode"):
+            ok, encoded = cv2.imencode(ENCODINGS[fmt][0], page)
+        if not ok:
+            raise ValueError("Çıktı kodlanamadı!")
+        return encoded.tobytes()
+
+    def metrics(self):
+        with self.lock:
+            latencies = np.array(self.latencies, dtype=np.float64)
+            waits = np.array(self.waits, dtype=np.float64)
+            data = {
+                "queue_depth": self.jobs.qsize(),
+                "queue_capacity": self.jobs.maxsize,
+                "workers": len(self.threads),
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+            }
+
+        def percentiles(values):
+            if len(values) == 0:
+                return {"p50": None, "p95": None, "p99": None}
+            p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000.0
+            return {"p50": round(p50, 2), "p95": round(p95, 2), "p99": round(p99, 2)}
+
+        data["latency_ms"] = percentiles(latencies)
+        data["queue_wait_ms"] = percentiles(waits)
+        return data
+
+
+class ScanHandler(BaseHTTPRequestHandler):
+    # POST /scan?format=png|jpg&output=warped|gray|contrast|binary
+    #                           : gövde ham görsel baytlarıdır, yanıt düzeltilmiş sayfadır
+    # GET /metrics              : gecikme yüzdelikleri ve kuyruk derinliği (JSON)
+    # GET /metrics/stages       : aşama süre histogramları (Prometheus metni, --profile ile)
+    service = None
+    timeout_seconds = 60
+    max_body_bytes = MAX_BODY_BYTES
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, data, headers=None):
+        self._send(status, json.dumps(data, ensure_ascii=False).encode("utf-8"), headers=headers)
+
+    def _reject_unread(self, status, data, headers=None):
+        # Gövde okunmadan verilen yanıt: okunmamış baytlar sonraki istek sanılmasın
+        # diye bağlantı kapatılır
+        self.close_connection = True
+        self._send_json(status, data, dict(headers or {}, Connection="close"))
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/metrics":
+            self._send_json(200, self.service.metrics())
+        elif path == "/metrics/stages" and profiling.is_enabled():
+            self._send(200, profiling.prometheus_text().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+        elif path == "/healthz":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "Bulunamadı"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/scan":
+            self._send_json(404, {"error": "Bulunamadı"})
+            return
+        query = parse_qs(url.query)
+        fmt = query.get("format", ["png"])[0].lower()
+        output = query.get("output", ["warped"])[0].lower()
+        if fmt not in ENCODINGS:
+            self._send_json(400, {"error": f"Desteklenmeyen format: {fmt}"})
+            return
+        if output not in OUTPUTS:
+            self._send_json(400, {"error": f"Desteklenmeyen çıktı: {output}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self._send_json(400, {"error": "Geçersiz Content-Length"})
+            return
+        if length <= 0:
+            self._send_json(400, {"error": "Boş istek gövdesi"})
+            return
+        if length > self.max_body_bytes:
+            self._reject_unread(413, {"error": f"İstek gövdesi en fazla {self.max_body_bytes} bayt olabilir"})
+            return
+        # Kuyruk doluysa gövde boşuna okunmaz
+        if not self.service.accepting():
+            self._reject_unread(503, {"error": "Kuyruk dolu, daha sonra tekrar deneyin"}, {"Retry-After": "1"})
+            return
+        data = self.rfile.read(length)
+
+        future = self.service.submit(data, fmt, output)
+        if future is None:
+            self._send_json(503, {"error": "Kuyruk dolu, daha sonra tekrar deneyin"}, {"Retry-After": "1"})
+            return
+        try:
+            body = future.result(timeout=self.timeout_seconds)
+        except FutureTimeoutError:
+            self.service.cancel(future)
+            self._send_json(504, {"error": f"İşlem {self.timeout_seconds} saniyede tamamlanamadı"})
+            return
+        except ValueError as e:
+            self._send_json(422, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send(200, body, ENCODINGS[fmt][1])
+
+    def log_message(self, format, *args):
+        # Her istek için stderr'e yazmak yüksek hızda darboğaz olur
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Belge düzeltme HTTP servisi.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=4, help="İşleme iş parçacığı sayısı")
+    parser.add_argument("--queue-size", type=int, default=16, help="Bekleyen iş sınırı (geri basınç)")
+    parser.add_argument("--max-body-mb", type=float, default=MAX_BODY_BYTES / (1024 * 1024),
+                        help="Kabul edilen en büyük görsel boyutu (MB); büyükleri 413 ile reddedilir")
+    parser.add_argument("--full-resolution", action="store_true", help="Köşe tespitini tam çözünürlükte yap")
+    parser.add_argument("--cv-threads", type=int, default=None,
+                        help="OpenCV iç iş parçacığı sayısı (havuzla aşırı abonelik olmaması için 1 önerilir)")
+    profiling.add_arguments(parser)
+    args = parser.parse_args(argv)
+    profiling.start_from_args(args)
+
+    if args.cv_threads is not None:
+        cv2.setNumThreads(args.cv_threads)
+
+    ScanHandler.service = ScanService(args.workers, args.queue_size, proxy=not args.full_resolution)
+    ScanHandler.max_body_bytes = int(args.max_body_mb * 1024 * 1024)
+    server = ThreadingHTTPServer((args.host, args.port), ScanHandler)
+    print(f"Servis http://{args.host}:{args.port} adresinde çalışıyor (POST /scan, GET /metrics)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        profiling.finish_from_args(args, sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
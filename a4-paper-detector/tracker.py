@@ -0,0 +1,168 @@
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+
+import common_path  # noqa: F401
+import profiling
+from detection import PROXY_MAX_SIDE, find_document_quad, order_points, refine_corners, warp_document
+
+LK_PARAMS = dict(winSize=(21, 21), maxLevel=3,
+                 criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+
+class QuadTracker:
+    # Canlı çekimde belge dörtgenini kareden kareye izler. Köşeler önceki karedeki
+    # konumlarının çevresinde (Lucas-Kanade optik akış) aranır; tam Canny + kontur
+    # araması yalnızca izleme kaybolduğunda yapılır. Köşeler stable_frames kare
+    # boyunca stable_tolerance pikselden az oynarsa dörtgen "sabit" kabul edilir.
+    # Oynama, sabit pencerenin başladığı karedeki köşelere göre ölçülür; böylece
+    # kareden kareye küçük ama birikerek büyüyen kayma sabit sayılmaz.
+
+    def __init__(self, max_side=PROXY_MAX_SIDE, stable_frames=5, stable_tolerance=2.0,
+                 max_area_change=0.2, refine=False):
+        self.max_side = max_side
+        self.stable_frames = stable_frames
+        self.stable_tolerance = stable_tolerance
+        self.max_area_change = max_area_change
+        self.refine = refine
+        self.reset()
+
+    def reset(self):
+        self.prev_gray = None
+        self.corners = None  # Küçük görüntü koordinatlarında
+        self.anchor = None  # Sabit pencerenin başındaki köşeler
+        self.still_count = 0
+        self.full_searches = 0
+
+    def _proxy_gray(self, frame):
+        height, width = frame.shape[:2]
+        scale = max(max(height, width) / float(self.max_side), 1.0)
+        if scale > 1.0:
+            frame = cv2.resize(frame, (int(round(width / scale)), int(round(height / scale))),
+                               interpolation=cv2.INTER_AREA)
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return gray, scale
+
+    @profiling.profiled("track")
+    def _track(self, gray):
+        points = self.corners.reshape(4, 1, 2)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, points, None, **LK_PARAMS)
+        if moved is None or not status.all():
+            return None
+        moved = moved.reshape(4, 2)
+
+        # Bozulmuş dörtgeni (dışbükey değil veya alanı ani değişmiş) kabul etme
+        contour = order_points(moved).reshape(4, 1, 2)
+        if not cv2.isContourConvex(contour):
+            return None
+        prev_area = cv2.contourArea(order_points(self.corners))
+        area = cv2.contourArea(contour)
+        if prev_area <= 0 or abs(area - prev_area) / prev_area > self.max_area_change:
+            return None
+        return moved
+
+    @profiling.profiled("detect")
+    def _detect(self, gray):
+        self.full_searches += 1
+        quad = find_document_quad(gray)
+        if quad is None:
+            return None
+        return order_points(quad)
+
+    def update(self, frame):
+        # Kareyi işler; (tam çözünürlük köşeleri veya None, sabit mi) döner
+        gray, scale = self._proxy_gray(frame)
+
+        corners = self._track(gray) if self.corners is not None else None
+        if corners is None:
+            corners = self._detect(gray)
+            self.still_count = 0
+            self.anchor = None
+        corners = None if corners is None else order_points(corners)
+
+        if corners is not None and self.anchor is not None \
+                and np.abs(corners - self.anchor).max() <= self.stable_tolerance:
+            self.still_count += 1
+        else:
+            # Toplam kayma toleransı aştı: sabit pencere bu kareden yeniden başlar
+            self.still_count = 0
+            self.anchor = corners
+
+        self.prev_gray = gray
+        self.corners = corners
+        if self.corners is None:
+            return None, False
+
+        full = self.corners * scale
+        stable = self.still_count >= self.stable_frames
+        if stable and self.refine and scale > 1.0:
+            full = refine_corners(frame, full, scale)
+        return full.astype("float32"), stable
+
+
+def iter_rectified(frames, tracker=None):
+    # Karelerden yalnızca dörtgen sabitken düzeltilmiş sayfa üretir: (kare no, sayfa)
+    tracker = tracker or QuadTracker(refine=True)
+    for index, frame in enumerate(frames):
+        corners, stable = tracker.update(frame)
+        if stable:
+            yield index, warp_document(frame, corners)
+
+
+def read_frames(source):
+    capture = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    if not capture.isOpened():
+        raise ValueError(f"Video kaynağı açılamadı: {source}")
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield frame
+    finally:
+        capture.release()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Canlı belge yakalama: dörtgeni izler, sabitken sayfayı düzeltir.")
+    parser.add_argument("source", help="Kamera numarası (ör. 0) veya video dosyası")
+    parser.add_argument("-o", "--output-dir", help="Sabit karelerden düzeltilen sayfaların yazılacağı klasör")
+    parser.add_argument("--show", action="store_true", help="İzlenen dörtgeni pencerede göster")
+    profiling.add_arguments(parser)
+    args = parser.parse_args(argv)
+    profiling.start_from_args(args)
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    tracker = QuadTracker(refine=True)
+    saved = False
+    for index, frame in enumerate(read_frames(args.source)):
+        corners, stable = tracker.update(frame)
+        if stable and args.output_dir and not saved:
+            # Her sabitlenmede bir sayfa kaydedilir; dörtgen oynayınca yeniden hazırlanır
+            page = warp_document(frame, corners)
+            with profiling.stage("imwrite"):
+                cv2.imwrite(os.path.join(args.output_dir, f"page_{index:06d}.jpg"), page)
+            saved = True
+        elif not stable:
+            saved = False
+        if args.show:
+            view = frame.copy()
+            if corners is not None:
+                color = (0, 255, 0) if stable else (0, 200, 255)
+                cv2.polylines(view, [corners.round().astype(np.int32)], True, color, 3)
+            cv2.imshow("Belge", view)
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                break
+    if args.show:
+        cv2.destroyAllWindows()
+    print(f"Tam arama sayısı: {tracker.full_searches}")
+    profiling.finish_from_args(args, sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
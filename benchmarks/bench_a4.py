@@ -0,0 +1,96 @@
+import contextlib
+import sys
+
+import cv2
+import numpy as np
+
+from benchlib import add_noise, base_parser, emit, run_benchmark, use_project
+
+use_project("a4-paper-detector")
+
+import common_path  # noqa: E402, F401
+from detection import order_points  # noqa: E402
+from scanner import run_stages  # noqa: E402
+
+# Ölçek 1'de fotoğraf boyutu (genişlik, yükseklik) ve sayfanın genişliğe oranı
+PHOTO_SIZE = (1500, 2000)
+PAGE_WIDTH_RATIO = 0.6
+A4_RATIO = 297.0 / 210.0
+
+BACKGROUND_GRAY = 60
+PAGE_GRAY = 235
+
+
+def render_page(rng, width, height):
+    # Kenar boşluklu, metin satırlarını andıran koyu şeritli düz sayfa
+    page = np.full((height, width, 3), PAGE_GRAY, dtype=np.uint8)
+    margin = int(width * 0.1)
+    line_height = max(int(height * 0.01), 2)
+    y = margin
+    while y + line_height < height - margin:
+        length = int(rng.uniform(0.4, 1.0) * (width - 2 * margin))
+        cv2.rectangle(page, (margin, y), (margin + length, y + line_height), (40, 40, 40), -1)
+        y += int(line_height * rng.uniform(2.0, 3.5))
+    return page
+
+
+def make_photo(rng, scale, skew, noise):
+    # Koyu zemin üzerinde perspektifle bozulmuş sayfa. Dönüş: (görüntü, gerçek köşeler)
+    width, height = (int(round(v * scale)) for v in PHOTO_SIZE)
+    page_w = int(round(width * PAGE_WIDTH_RATIO))
+    page_h = int(round(page_w * A4_RATIO))
+    page = render_page(rng, page_w, page_h)
+
+    x0, y0 = (width - page_w) / 2.0, (height - page_h) / 2.0
+    corners = np.float32([[x0, y0], [x0 + page_w, y0], [x0 + page_w, y0 + page_h], [x0, y0 + page_h]])
+    corners += rng.uniform(-1, 1, (4, 2)).astype(np.float32) * skew * min(width, height)
+
+    src = np.float32([[0, 0], [page_w, 0], [page_w, page_h], [0, page_h]])
+    M = cv2.getPerspectiveTransform(src, corners)
+    photo = np.full((height, width, 3), BACKGROUND_GRAY, dtype=np.uint8)
+    # Zemin dokusu: bulanık gürültü
+    texture = np.empty((height, width, 3), dtype=np.int16)
+    cv2.setRNGSeed(int(rng.integers(2 ** 31)))
+    cv2.randn(texture, (0, 0, 0), (25, 25, 25))
+    photo = cv2.add(photo, cv2.GaussianBlur(texture, (0, 0), 3), dtype=cv2.CV_8U)
+    cv2.warpPerspective(page, M, (width, height), dst=photo, borderMode=cv2.BORDER_TRANSPARENT)
+
+    return add_noise(photo, rng, noise), corners
+
+
+def main(argv=None):
+    parser = base_parser("A4 belge bulma kıyaslaması (perspektifle bozulmuş sentetik sayfalar).")
+    parser.add_argument("--skew", type=float, default=0.05, help="Köşe sapması (kısa kenarın oranı)")
+    parser.add_argument("--noise", type=float, default=5.0, help="Gauss gürültüsü standart sapması")
+    parser.add_argument("--full", action="store_true", help="Köşeleri küçültülmüş kopya yerine tam çözünürlükte ara")
+    args = parser.parse_args(argv)
+    proxy = not args.full
+
+    def make_fixture(rng):
+        return make_photo(rng, args.scale, args.skew, args.noise)
+
+    def process(image):
+        # scanner.scan_document(output="binary") hızlı yolu; köşeler doğruluk için ayrıca istenir
+        try:
+            return run_stages(image, ("corners", "binary"), proxy)["corners"]
+        except ValueError:
+            return None
+
+    params = {"skew": args.skew, "noise": args.noise, "proxy": proxy}
+    report, outcomes = run_benchmark("a4", args, make_fixture, process, params)
+
+    # Köşe hatası: sıralanmış bulunan ve gerçek köşeler arasındaki en büyük uzaklık
+    errors = [float(np.linalg.norm(order_points(found) - order_points(truth), axis=1).max())
+              for found, truth in outcomes if found is not None]
+    report["accuracy"] = {
+        "detected": round(len(errors) / len(outcomes), 4),
+        "mean_corner_error_px": round(float(np.mean(errors)), 3) if errors else None,
+        "max_corner_error_px": round(float(np.max(errors)), 3) if errors else None,
+    }
+    return report
+
+
+if __name__ == "__main__":
+    with contextlib.redirect_stdout(sys.stderr):
+        report = main()
+    emit(report)
@@ -0,0 +1,106 @@
+import contextlib
+import sys
+
+import cv2
+import numpy as np
+
+from benchlib import add_noise, base_parser, emit, run_benchmark, use_project
+
+use_project("grain-count-detector")
+
+from pipeline import count_kernels  # noqa: E402
+
+# Ölçek 1'de tepsi boyutu (genişlik, yükseklik) ve tane yarı eksenleri (piksel)
+TRAY_SIZE = (1600, 1200)
+KERNEL_AXES = (22, 15)
+
+# Gri tepsi zemini ve sarı/turuncu tane rengi (BGR)
+TRAY_GRAY = 125
+KERNEL_COLOR = (35, 175, 230)
+
+# Blur/eşikleme sonrasında komşu tanelerin birleşmemesi için en az boşluk (piksel)
+MIN_GAP = 20
+
+
+def place_kernels(rng, size, axes, count, touching):
+    # Tane merkezleri, çakışmayacak şekilde reddetmeli örneklemeyle. touching
+    # oranındaki taneler bir önceki tanenin hemen yanına (dokunarak) konur.
+    width, height = size
+    a = axes[0]
+    spacing = 2 * a + MIN_GAP
+    centers = []
+    for _ in range(count * 200):
+        if len(centers) == count:
+            break
+        if centers and rng.random() < touching:
+            angle = rng.uniform(0, 2 * np.pi)
+            px, py = centers[-1]
+            candidate = (px + 1.8 * axes[1] * np.cos(angle), py + 1.8 * axes[1] * np.sin(angle))
+            others = centers[:-1]
+        else:
+            candidate = (rng.uniform(a + 10, width - a - 10), rng.uniform(a + 10, height - a - 10))
+            others = centers
+        x, y = candidate
+        if not (a + 10 <= x <= width - a - 10 and a + 10 <= y <= height - a - 10):
+            continue
+        if all(np.hypot(x - ox, y - oy) >= spacing for ox, oy in others):
+            centers.append(candidate)
+    return centers
+
+
+def make_tray(rng, scale, count, touching, noise):
+    # Gri zeminli tepsi ve üzerinde bilinen sayıda elips tane (BGRA, opak)
+    width, height = (int(round(v * scale)) for v in TRAY_SIZE)
+    axes = tuple(max(int(round(v * scale)), 2) for v in KERNEL_AXES)
+    image = np.full((height, width, 3), TRAY_GRAY, dtype=np.uint8)
+    # Hafif aydınlatma eğimi (zemin gri kalır)
+    image = cv2.add(image, np.linspace(-20, 20, width, dtype=np.float32)[None, :, None]
+                    .repeat(height, 0).repeat(3, 2), dtype=cv2.CV_8U)
+
+    centers = place_kernels(rng, (width, height), axes, count, touching)
+    for x, y in centers:
+        jitter = rng.integers(-15, 16, 3)
+        color = tuple(int(np.clip(c + j, 0, 255)) for c, j in zip(KERNEL_COLOR, jitter))
+        angle = float(rng.uniform(0, 180))
+        center = (int(round(x)), int(round(y)))
+        cv2.ellipse(image, center, axes, angle, 0, 360, color, -1, cv2.LINE_AA)
+        # Tanenin ortasındaki daha açık benek
+        inner = (max(axes[0] // 2, 1), max(axes[1] // 2, 1))
+        lighter = tuple(min(c + 20, 255) for c in color)
+        cv2.ellipse(image, center, inner, angle, 0, 360, lighter, -1, cv2.LINE_AA)
+
+    image = add_noise(image, rng, noise)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2BGRA), len(centers)
+
+
+def main(argv=None):
+    parser = base_parser("Mısır tanesi sayma kıyaslaması (bilinen sayıda taneli sentetik tepsiler).")
+    parser.add_argument("--kernels", type=int, default=60, help="Tepsi başına tane sayısı")
+    parser.add_argument("--touching", type=float, default=0.0, help="Komşusuna dokunan tane oranı")
+    parser.add_argument("--noise", type=float, default=4.0, help="Gauss gürültüsü standart sapması")
+    parser.add_argument("--mode", choices=["contour", "watershed", "area"], default="contour",
+                        help="Sayım modu")
+    args = parser.parse_args(argv)
+
+    def make_fixture(rng):
+        return make_tray(rng, args.scale, args.kernels, args.touching, args.noise)
+
+    def process(image):
+        # Kaplama çizimi toplu sayımda da kapalıdır (batch.py yalnızca istenirse çizer)
+        return count_kernels(image, draw=False, mode=args.mode)["count"]
+
+    params = {"kernels": args.kernels, "touching": args.touching, "noise": args.noise, "mode": args.mode}
+    report, outcomes = run_benchmark("grain", args, make_fixture, process, params)
+
+    errors = np.array([abs(int(got) - expected) / max(expected, 1) for got, expected in outcomes])
+    report["accuracy"] = {
+        "exact": round(float(np.mean([got == expected for got, expected in outcomes])), 4),
+        "mean_abs_error_ratio": round(float(errors.mean()), 4),
+    }
+    return report
+
+
+if __name__ == "__main__":
+    with contextlib.redirect_stdout(sys.stderr):
+        report = main()
+    emit(report)
@@ -0,0 +1,117 @@
+import contextlib
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from benchlib import add_noise, base_parser, emit, run_benchmark, use_project
+
+PROJECT = use_project("optic-form-reader")
+
+from engine import ANSWERS_REGION, read_sheet  # noqa: E402
+from layout import load_template_layout  # noqa: E402
+
+TEMPLATE_PATH = os.path.join(PROJECT, "TEMPLATE.png")
+
+# Yuvarlak çizim yarıçapları (şablon pikseli): boş yuvarlak ve işaret
+BUBBLE_RADIUS = 13
+MARK_RADIUS = 12
+
+
+def fill_sheet(template, layout, rng, ink):
+    # Şablondaki tüm yuvarlakları boşalt, her bölgeye rastgele işaretler koy.
+    # Metin bölgelerinde madde başına bir işaret (cevaplarda boş da olabilir),
+    # seçim bölgelerinde tek işaret. Dönüş: (görüntü, beklenen okuma)
+    image = template.copy()
+    for name in layout.regions:
+        centers = layout.centers(name)
+        flat = [c for line in centers for c in line] if layout.is_grid(name) else centers
+        for c in flat:
+            cv2.circle(image, tuple(map(int, c)), BUBBLE_RADIUS, (255, 255, 255), -1)
+            cv2.circle(image, tuple(map(int, c)), BUBBLE_RADIUS, (0, 0, 0), 1)
+
+    expected = {}
+    for name in layout.regions:
+        labels = layout.labels(name)
+        centers = layout.centers(name)
+        if layout.is_grid(name):
+            # Cevaplarda maddelerin altıda biri boş bırakılır ("X")
+            allow_blank = name == ANSWERS_REGION
+            text = ""
+            for line in centers:
+                i = int(rng.integers(len(line) + allow_blank))
+                if i == len(line):
+                    text += "X"
+                    continue
+                cv2.circle(image, tuple(map(int, line[i])), MARK_RADIUS, (ink,) * 3, -1)
+                text += str(labels[i])
+            expected[name] = text
+        else:
+            i = int(rng.integers(len(centers)))
+            cv2.circle(image, tuple(map(int, centers[i])), MARK_RADIUS, (ink,) * 3, -1)
+            expected[name] = labels[i]
+    return image, expected
+
+
+def distort(image, rng, skew, noise, scale):
+    # Perspektif eğim (köşeler kenar uzunluğunun skew oranında oynar), Gauss
+    # gürültüsü ve çözünürlük değişimi. Form kadrajdan taşmasın diye küçültülür.
+    h, w = image.shape[:2]
+    if skew > 0:
+        src = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+        margin = skew * np.array([w, h])
+        dst = src * (1 - 2 * skew) + margin + rng.uniform(-1, 1, (4, 2)) * margin
+        M = cv2.getPerspectiveTransform(src, dst.astype(np.float32))
+        image = cv2.warpPerspective(image, M, (w, h), borderValue=(255, 255, 255))
+    if scale != 1.0:
+        image = cv2.resize(image, (int(round(w * scale)), int(round(h * scale))), interpolation=cv2.INTER_AREA)
+    return add_noise(image, rng, noise)
+
+
+def main(argv=None):
+    parser = base_parser("Optik form okuma kıyaslaması (sentetik doldurulmuş formlar).")
+    parser.add_argument("--skew", type=float, default=0.03, help="Perspektif eğim oranı (0 eğimsiz)")
+    parser.add_argument("--noise", type=float, default=6.0, help="Gauss gürültüsü standart sapması")
+    parser.add_argument("--ink", type=int, default=40, help="İşaret parlaklığı (0 siyah, 255 beyaz)")
+    parser.add_argument("--no-align", action="store_true", help="Hizalama aşamasını atla")
+    args = parser.parse_args(argv)
+
+    layout = load_template_layout(TEMPLATE_PATH)
+    template = cv2.imread(TEMPLATE_PATH)
+    align = not args.no_align
+
+    def make_fixture(rng):
+        image, expected = fill_sheet(template, layout, rng, args.ink)
+        return distort(image, rng, args.skew, args.noise, args.scale), expected
+
+    def process(image):
+        return read_sheet(image, layout, align)
+
+    params = {"skew": args.skew, "noise": args.noise, "ink": args.ink, "align": align}
+    report, outcomes = run_benchmark("optic", args, make_fixture, process, params)
+
+    # Form doğruluğu: tüm alanlar doğru; madde doğruluğu: metin bölgelerinde
+    # karakter, seçim bölgelerinde alan bazında
+    sheets = items = items_ok = 0
+    for result, expected in outcomes:
+        sheets += all(result.get(name) == value for name, value in expected.items())
+        for name, value in expected.items():
+            got = result.get(name)
+            if isinstance(value, str) and layout.is_grid(name):
+                items += len(value)
+                items_ok += sum(a == b for a, b in zip(got or "", value))
+            else:
+                items += 1
+                items_ok += got == value
+    report["accuracy"] = {
+        "sheets": round(sheets / len(outcomes), 4),
+        "items": round(items_ok / items, 4),
+    }
+    return report
+
+
+if __name__ == "__main__":
+    with contextlib.redirect_stdout(sys.stderr):
+        report = main()
+    emit(report)
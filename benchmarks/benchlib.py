@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Aşama süreleri projelerin kullandığı ortak ölçüm modülünden okunur
+sys.path.append(os.path.join(ROOT, "common"))
+import profiling  # noqa: E402
+
+
+def use_project(name):
+    # Projeler düz modüller içerir (her birinde main.py, pipeline.py...); her
+    # kıyaslama ayrı süreçte çalışır ve yalnızca kendi proje klasörünü yola ekler
+    path = os.path.join(ROOT, name)
+    sys.path.insert(0, path)
+    return path
+
+
+class StageTimer:
+    # Aşama adı -> görüntü başına süreler (saniye). Aşamalar, projelerin kendi
+    # profiling.stage/profiled kancalarıdır; bir görüntüde birden çok kez çalışan
+    # aşamanın süreleri toplanır. Her görüntü için "total" ayrıca tutulur.
+
+    def __init__(self):
+        self.times = {}
+        self._image_start = None
+
+    def add(self, name, seconds):
+        self.times.setdefault(name, []).append(seconds)
+
+    def begin_image(self):
+        profiling.drain()
+        self._image_start = time.perf_counter()
+
+    def end_image(self):
+        self.add("total", time.perf_counter() - self._image_start)
+        per_stage = {}
+        for name, _, wall_ns, *_ in profiling.drain():
+            per_stage[name] = per_stage.get(name, 0.0) + wall_ns / 1e9
+        for name, seconds in per_stage.items():
+            self.add(name, seconds)
+
+    def summary(self):
+        # Aşama başına ms cinsinden ortalama, ortanca, p95 ve en kötü süre
+        result = {}
+        for name, values in self.times.items():
+            ms = np.asarray(values) * 1000.0
+            result[name] = {
+                "mean_ms": round(float(ms.mean()), 3),
+                "p50_ms": round(float(np.percentile(ms, 50)), 3),
+                "p95_ms": round(float(np.percentile(ms, 95)), 3),
+                "max_ms": round(float(ms.max()), 3),
+            }
+        return result
+
+
+def peak_rss_mb():
+    # Sürecin en yüksek bellek kullanımı; Linux'ta KB, macOS'ta bayt döner
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0), 1)
+
+
+def add_noise(image, rng, sigma):
+    # Gauss gürültüsü; float64 ara dizi yerine int16 üretilip doygun toplanır
+    # (büyük fikstürlerde bellek ölçümünü şişirmesin diye)
+    if sigma <= 0:
+        return image
+    noise = np.empty(image.shape, dtype=np.int16)
+    cv2.setRNGSeed(int(rng.integers(2 ** 31)))
+    channels = 1 if image.ndim == 2 else image.shape[2]
+    cv2.randn(noise, (0,) * channels, (sigma,) * channels)
+    return cv2.add(image, noise, dtype=cv2.CV_8U)
+
+
+def base_parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--scale", type=float, default=1.0, help="Fikstür çözünürlük katsayısı")
+    parser.add_argument("--count", type=int, default=10, help="Ölçülen görüntü sayısı")
+    parser.add_argument("--warmup", type=int, default=1, help="Ölçülmeden önce işlenen görüntü sayısı")
+    parser.add_argument("--seed", type=int, default=0, help="Fikstür üretimi için rastgele tohum")
+    return parser
+
+
+def run_benchmark(name, args, make_fixture, process, params=None):
+    # make_fixture(rng) -> (görüntü, beklenen); process(görüntü) -> sonuç. process
+    # projenin gerçek giriş noktasını çağırır, aşama süreleri ölçüm kancalarından gelir.
+    # Fikstürler zamanlama dışında, sırayla ve tek tek üretilir; böylece en yüksek
+    # bellek ölçümü tüm fikstürlerin toplamını değil işlem hattını yansıtır.
+    # Doğruluk ölçütleri dönen (sonuç, beklenen) çiftlerinden çağıranca hesaplanır.
+    # Isınma fikstürleri ayrı üreteçten gelir; ölçülen fikstürler --warmup'a bağlı değildir
+    profiling.enable()
+    warmup_rng = np.random.default_rng([args.seed, 1])
+    for _ in range(args.warmup):
+        image, _ = make_fixture(warmup_rng)
+        process(image)
+
+    rng = np.random.default_rng(args.seed)
+    timer = StageTimer()
+    outcomes = []
+    shape = None
+    for _ in range(args.count):
+        image, expected = make_fixture(rng)
+        shape = image.shape
+        timer.begin_image()
+        result = process(image)
+        timer.end_image()
+        outcomes.append((result, expected))
+
+    total = sum(timer.times.get("total", []))
+    return {
+        "pipeline": name,
+        "scale": args.scale,
+        "count": args.count,
+        "seed": args.seed,
+        "image_size": [int(shape[1]), int(shape[0])],
+        "params": params or {},
+        "stages": timer.summary(),
+        "images_per_sec": round(args.count / total, 3) if total > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }, outcomes
+
+
+def emit(report):
+    # Sonuç stdout'a tek satır JSON olarak yazılır; run.py bunu toplar
+    json.dump(report, sys.stdout, ensure_ascii=False)
+    sys.stdout.write("\n")
@@ -0,0 +1,162 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+import cv2
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# İşlem hattı -> kıyaslama betiği ve varsayılan çözünürlük katsayıları
+PIPELINES = {
+    "optic": ("bench_optic.py", [0.5, 0.75, 1.0]),
+    "grain": ("bench_grain.py", [0.5, 1.0, 2.0]),
+    "a4": ("bench_a4.py", [0.5, 1.0, 2.0]),
+}
+
+# Karşılaştırmada bu orandan fazla yavaşlama/bellek artışı gerileme sayılır
+REGRESSION_RATIO = 0.10
+
+RESULTS_VERSION = 1
+
+
+def git_revision():
+    try:
+        output = subprocess.run(["git", "-C", HERE, "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "-C", HERE, "status", "--porcelain"],
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output + ("-dirty" if dirty else "")
+
+
+def environment():
+    return {
+        "git": git_revision(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run_one(script, scale, args):
+    # Her (işlem hattı, çözünürlük) ayrı süreçte çalışır: projelerin aynı adlı
+    # modülleri çakışmaz ve en yüksek bellek ölçümü yalnızca o çalışmaya aittir
+    command = [sys.executable, os.path.join(HERE, script), "--scale", str(scale),
+               "--count", str(args.count), "--warmup", str(args.warmup), "--seed", str(args.seed)]
+    completed = subprocess.run(command, capture_output=True, text=True, cwd=HERE)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{script} --scale {scale} başarısız oldu:\n{completed.stderr.strip()}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def result_key(result):
+    # Yalnızca aynı fikstür ayarlarıyla (eğim, gürültü, mod...) yapılan ölçümler karşılaştırılır
+    return result["pipeline"], result["scale"], json.dumps(result.get("params", {}), sort_keys=True)
+
+
+def compare(old, new, out=sys.stdout):
+    # Ortak (işlem hattı, çözünürlük) çiftleri için hız, bellek ve doğruluk farkları.
+    # Dönüş: gerileme sayısı
+    previous = {result_key(r): r for r in old["results"]}
+    print(f"Karşılaştırma: {old['environment'].get('git')} -> {new['environment'].get('git')}", file=out)
+    regressions = 0
+    for result in new["results"]:
+        before = previous.get(result_key(result))
+        if before is None:
+            continue
+        notes = []
+        speed_old, speed_new = before["images_per_sec"], result["images_per_sec"]
+        if speed_old and speed_new:
+            change = speed_new / speed_old - 1
+            notes.append(f"hız {speed_old:.2f} -> {speed_new:.2f} görüntü/sn ({change:+.1%})")
+            if change < -REGRESSION_RATIO:
+                notes.append("YAVAŞLAMA")
+                regressions += 1
+        rss_old, rss_new = before["peak_rss_mb"], result["peak_rss_mb"]
+        notes.append(f"bellek {rss_old:.0f} -> {rss_new:.0f} MB")
+        if rss_new > rss_old * (1 + REGRESSION_RATIO):
+            notes.append("BELLEK ARTIŞI")
+            regressions += 1
+        for metric, value in result.get("accuracy", {}).items():
+            previous_value = before.get("accuracy", {}).get(metric)
+            if previous_value != value:
+                notes.append(f"{metric} {previous_value} -> {value}")
+                if _is_worse(metric, previous_value, value):
+                    notes.append("DOĞRULUK DÜŞÜŞÜ")
+                    regressions += 1
+        print(f"{result['pipeline']:6s} x{result['scale']:<5g} " + ", ".join(notes), file=out)
+    return regressions
+
+
+def _is_worse(metric, old, new):
+    # Hata ölçütlerinde (ad "error" içerir) artış, diğerlerinde düşüş kötüleşmedir
+    if old is None or new is None:
+        return new is None and old is not None
+    return new > old if "error" in metric else new < old
+
+
+def print_summary(results, out=sys.stdout):
+    for result in results:
+        stages = ", ".join(f"{name} {stats['mean_ms']:.1f}" for name, stats in result["stages"].items())
+        accuracy = ", ".join(f"{k} {v}" for k, v in result.get("accuracy", {}).items())
+        size = "x".join(str(v) for v in result["image_size"])
+        print(f"{result['pipeline']:6s} x{result['scale']:<5g} {size:>10s}  "
+              f"{result['images_per_sec']:7.2f} görüntü/sn  {result['peak_rss_mb']:6.0f} MB  "
+              f"[{stages} ms]  {accuracy}", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Üç işlem hattının sentetik fikstürlerle kıyaslaması.")
+    parser.add_argument("pipelines", nargs="*", help=f"Çalıştırılacak işlem hatları: {', '.join(PIPELINES)} "
+                                                     "(varsayılan: hepsi)")
+    parser.add_argument("--scales", type=float, nargs="+", help="Çözünürlük katsayıları (varsayılan: hat başına)")
+    parser.add_argument("--count", type=int, default=10, help="Çözünürlük başına ölçülen görüntü sayısı")
+    parser.add_argument("--warmup", type=int, default=1, help="Ölçülmeden önce işlenen görüntü sayısı")
+    parser.add_argument("--seed", type=int, default=0, help="Fikstür üretimi için rastgele tohum")
+    parser.add_argument("-o", "--output", help="Sonuçların yazılacağı JSON dosyası")
+    parser.add_argument("--compare", help="Karşılaştırılacak önceki sonuç dosyası")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.pipelines if name not in PIPELINES]
+    if unknown:
+        parser.error(f"Bilinmeyen işlem hattı: {', '.join(unknown)}")
+
+    results = []
+    for name in args.pipelines or list(PIPELINES):
+        script, scales = PIPELINES[name]
+        for scale in args.scales or scales:
+            print(f"{name} x{scale:g} çalışıyor...", file=sys.stderr)
+            results.append(run_one(script, scale, args))
+
+    report = {
+        "version": RESULTS_VERSION,
+        "environment": environment(),
+        "settings": {"count": args.count, "warmup": args.warmup, "seed": args.seed},
+        "results": results,
+    }
+    print_summary(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        if old.get("version") != RESULTS_VERSION:
+            raise ValueError(f"Desteklenmeyen sonuç dosyası sürümü: {old.get('version')}")
+        if compare(old, report):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
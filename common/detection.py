@@ -0,0 +1,118 @@
+import cv2
+import numpy as np
+
+from profiling import profiled
+
+# Kağıt (sayfa) köşelerini bulma ve belgeyi düzleştirme. a4-paper-detector'ın
+# tarayıcısı ve izleyicisi ile optic-form-reader'ın sayfa köşesi hizalaması kullanır.
+
+# Köşe araması yapılan küçültülmüş görüntünün uzun kenarı (piksel)
+PROXY_MAX_SIDE = 800
+
+
+def order_points(pts):
+    rect = np.zeros((4, 2), dtype = "float32")
+    s = pts.sum(axis=1)
+    rect[0] = pts[np.argmin(s)]
+    rect[2] = pts[np.argmax(s)]
+    diff = np.diff(pts, axis=1)
+    rect[1] = pts[np.argmin(diff)]
+    rect[3] = pts[np.argmax(diff)]
+    return rect
+
+
+def find_quad_in_edges(edges):
+    # Kenar görüntüsündeki en büyük 4 köşeli konturu bul
+    contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    contours = sorted(contours, key=cv2.contourArea, reverse=True)
+
+    for cnt in contours:
+        peri = cv2.arcLength(cnt, True)
+        approx = cv2.approxPolyDP(cnt, 0.02 * peri, True)
+        if len(approx) == 4:
+            return approx
+    return None
+
+
+@profiled()
+def find_document_quad(img):
+    # Tam çözünürlükte arama: gri, blur, Canny ve kontur
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    blur = cv2.GaussianBlur(gray, (5, 5), 0)
+    edges = cv2.Canny(blur, 75, 200)
+    quad = find_quad_in_edges(edges)
+    if quad is None:
+        return None
+    return quad.reshape(4, 2).astype("float32")
+
+
+@profiled()
+def refine_corners(img, corners, scale):
+    # Küçük görüntüden taşınan köşeleri tam çözünürlükte yalnızca köşe çevresindeki
+    # küçük pencerelerde iyileştirir; görüntünün geri kalanına dokunulmaz.
+    height, width = img.shape[:2]
+    half = int(np.ceil(scale)) * 4 + 4
+    win = max(int(np.ceil(scale)) * 2, 3)
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.01)
+
+    refined = corners.copy()
+    for i, (x, y) in enumerate(corners):
+        x0, y0 = max(int(x) - half, 0), max(int(y) - half, 0)
+        x1, y1 = min(int(x) + half + 1, width), min(int(y) + half + 1, height)
+        patch = img[y0:y1, x0:x1]
+        if patch.shape[0] <= 2 * win + 5 or patch.shape[1] <= 2 * win + 5:
+            continue
+        if patch.ndim == 3:
+            patch = cv2.cvtColor(patch, cv2.COLOR_BGR2GRAY)
+        point = np.array([[[x - x0, y - y0]]], dtype="float32")
+        point = cv2.cornerSubPix(patch, point, (win, win), (-1, -1), criteria)
+        nx, ny = point[0, 0] + (x0, y0)
+        # İyileştirme köşeyi fazla uzağa kaydırdıysa yanlış kenara kilitlenmiştir
+        if abs(nx - x) <= 2 * scale and abs(ny - y) <= 2 * scale:
+            refined[i] = (nx, ny)
+    return refined
+
+
+@profiled()
+def find_document_quad_proxy(img, max_side=PROXY_MAX_SIDE, refine=True):
+    # Belge dörtgenini küçültülmüş bir kopyada bul, köşeleri tam çözünürlüğe taşı
+    # ve yerel olarak iyileştir. Küçük görüntülerde doğrudan tam arama yapılır.
+    height, width = img.shape[:2]
+    scale = max(height, width) / float(max_side)
+    if scale <= 1.0:
+        return find_document_quad(img)
+
+    proxy = cv2.resize(img, (int(round(width / scale)), int(round(height / scale))),
+                       interpolation=cv2.INTER_AREA)
+    quad = find_document_quad(proxy)
+    if quad is None:
+        return None
+
+    corners = quad * scale
+    if refine:
+        corners = refine_corners(img, corners, scale)
+    return corners.astype("float32")
+
+
+@profiled()
+def warp_document(img, corners):
+    # Köşeleri sıralayıp belgeyi düz (kuşbakışı) görünüme getir
+    rect = order_points(corners)
+    (tl, tr, br, bl) = rect
+
+    widthA = np.linalg.norm(br - bl)
+    widthB = np.linalg.norm(tr - tl)
+    maxWidth = max(int(widthA), int(widthB))
+
+    heightA = np.linalg.norm(tr - br)
+    heightB = np.linalg.norm(tl - bl)
+    maxHeight = max(int(heightA), int(heightB))
+
+    dst = np.array([
+        [0, 0],
+        [maxWidth - 1, 0],
+        [maxWidth - 1, maxHeight - 1],
+        [0, maxHeight - 1]], dtype = "float32")
+
+    M = cv2.getPerspectiveTransform(rect, dst)
+    return cv2.warpPerspective(img, M, (maxWidth, maxHeight))
@@ -0,0 +1,318 @@
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Aşama ölçümü: adlandırılmış her aşama için duvar saati süresi, işlemci süresi ve
+# (istenirse) aşama boyunca ayrılan en yüksek ek bellek kaydedilir. Kapalıyken
+# stage() paylaşılan boş bir bağlam yöneticisi döner, profiled() sarmalayıcısı ise
+# doğrudan asıl fonksiyonu çağırır; ölçüm maliyeti bir bayrak kontrolüdür.
+# Üç proje de bu modülü kullanır; her projedeki common_path modülü bu klasörü
+# sys.path'e ekler.
+
+# Prometheus histogram sınırları (saniye)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Chrome izi için saklanan en fazla olay; toplamlar (histogramlar) sınırsız güncellenir
+MAX_EVENTS = 200000
+
+METRIC_PREFIX = "pipeline_stage"
+
+
+class _State:
+    def __init__(self):
+        self.enabled = False
+        self.memory = False
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.stats = {}
+        self.events = []
+        self.dropped = 0
+
+
+_state = _State()
+
+
+class StageStats:
+    # Bir aşamanın toplu istatistikleri
+    __slots__ = ("count", "wall", "cpu", "alloc", "alloc_max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.alloc = 0
+        self.alloc_max = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def add(self, wall, cpu, alloc):
+        self.count += 1
+        self.wall += wall
+        self.cpu += cpu
+        self.alloc += alloc
+        self.alloc_max = max(self.alloc_max, alloc)
+        for i, bound in enumerate(BUCKETS):
+            if wall <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+
+def is_enabled():
+    return _state.enabled
+
+
+def enable(memory=False):
+    # memory=True ise tracemalloc açılır; Python/NumPy ayırmaları izlenir ama
+    # işlem belirgin yavaşlar, bu yüzden varsayılan olarak kapalıdır
+    _state.memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _state.enabled = True
+
+
+def disable():
+    _state.enabled = False
+    if _state.memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _state.memory = False
+
+
+def config():
+    # İşçi süreçlere aktarılacak ayarlar; kapalıysa None
+    return {"memory": _state.memory} if _state.enabled else None
+
+
+def reset():
+    with _state.lock:
+        _state.stats = {}
+        _state.events = []
+        _state.dropped = 0
+
+
+def _record(name, start, wall_ns, cpu_ns, alloc, pid, tid):
+    with _state.lock:
+        stats = _state.stats.get(name)
+        if stats is None:
+            stats = _state.stats[name] = StageStats()
+        stats.add(wall_ns / 1e9, cpu_ns / 1e9, alloc)
+        if len(_state.events) < MAX_EVENTS:
+            _state.events.append((name, start, wall_ns, cpu_ns, alloc, pid, tid))
+        else:
+            _state.dropped += 1
+
+
+class _Stage:
+    __slots__ = ("name", "start", "cpu", "frame")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        if _state.memory:
+            # İç içe aşamalar için yığın: iç aşamanın tepe değeri dıştakine aktarılır
+            stack = getattr(_state.local, "stack", None)
+            if stack is None:
+                stack = _state.local.stack = []
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1][1] = max(stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            self.frame = [current, current]
+            stack.append(self.frame)
+        else:
+            self.frame = None
+        self.cpu = time.thread_time_ns()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        cpu = time.thread_time_ns() - self.cpu
+        alloc = 0
+        if self.frame is not None and tracemalloc.is_tracing():
+            stack = _state.local.stack
+            _, peak = tracemalloc.get_traced_memory()
+            self.frame[1] = max(self.frame[1], peak)
+            alloc = self.frame[1] - self.frame[0]
+            stack.pop()
+            if stack:
+                stack[-1][1] = max(stack[-1][1], self.frame[1])
+            tracemalloc.reset_peak()
+        _record(self.name, self.start, end - self.start, cpu, alloc, os.getpid(), threading.get_ident())
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name):
+    # with stage("imread"): ... — kapalıyken hiçbir şey ölçülmez
+    return _Stage(name) if _state.enabled else _NULL_STAGE
+
+
+def profiled(name=None):
+    # Fonksiyonu bir aşama olarak ölçen dekoratör (ad verilmezse fonksiyon adı)
+    def decorate(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return func(*args, **kwargs)
+            with _Stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def drain():
+    # İşçi süreçte biriken olayları alıp temizler (ana sürece gönderilmek üzere)
+    with _state.lock:
+        events, _state.events = _state.events, []
+        _state.stats = {}
+    return events
+
+
+def merge(events):
+    # İşçi süreçten gelen olayları bu sürecin toplamlarına ve izine ekler
+    for event in events or ():
+        _record(*event)
+
+
+def snapshot():
+    # Aşama adı -> toplu istatistikler (sözlük olarak)
+    with _state.lock:
+        return {name: {"count": s.count, "wall_s": s.wall, "cpu_s": s.cpu, "alloc_bytes": s.alloc,
+                       "alloc_max_bytes": s.alloc_max, "buckets": list(s.buckets)}
+                for name, s in _state.stats.items()}
+
+
+def chrome_trace():
+    # chrome://tracing veya Perfetto'da açılabilen "tam olay" (ph: X) listesi
+    with _state.lock:
+        events = list(_state.events)
+        dropped = _state.dropped
+    trace = [{"name": name, "ph": "X", "ts": start / 1000.0, "dur": wall / 1000.0, "pid": pid, "tid": tid,
+              "args": {"cpu_ms": round(cpu / 1e6, 3), "alloc_bytes": alloc}}
+             for name, start, wall, cpu, alloc, pid, tid in events]
+    return {"traceEvents": trace, "displayTimeUnit": "ms", "otherData": {"dropped_events": dropped}}
+
+
+def write_chrome_trace(path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(), f)
+
+
+def prometheus_text():
+    # Prometheus metin biçimi: süre histogramı, işlemci süresi ve bellek sayaçları
+    stats = snapshot()
+    wall = f"{METRIC_PREFIX}_wall_seconds"
+    lines = [f"# HELP {wall} Aşama başına duvar saati süresi.", f"# TYPE {wall} histogram"]
+    for name, s in sorted(stats.items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), s["buckets"]):
+            cumulative += count
+            lines.append(f'{wall}_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+        lines.append(f'{wall}_sum{{stage="{name}"}} {s["wall_s"]:.6f}')
+        lines.append(f'{wall}_count{{stage="{name}"}} {s["count"]}')
+
+    for metric, key, help_text in (("cpu_seconds_total", "cpu_s", "Aşama başına toplam işlemci süresi."),
+                                   ("alloc_bytes_total", "alloc_bytes",
+                                    "Aşama başına ayrılan en yüksek ek belleğin toplamı.")):
+        full = f"{METRIC_PREFIX}_{metric}"
+        lines += [f"# HELP {full} {help_text}", f"# TYPE {full} counter"]
+        for name, s in sorted(stats.items()):
+            value = f"{s[key]:.6f}" if isinstance(s[key], float) else s[key]
+            lines.append(f'{full}{{stage="{name}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    # node_exporter textfile toplayıcısı için; yarım dosya okunmasın diye önce geçici dosyaya
+    temp = path + ".tmp"
+    with open(temp, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(temp, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_prometheus(port, host=""):
+    # /metrics adresini arka plan iş parçacığında sunar; sunucu nesnesi döner
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def summary_table():
+    # En çok süre harcanan aşamalar başta olacak şekilde metin özet; bellek
+    # sütunu yalnızca bellek ölçümü açıksa yazılır
+    stats = snapshot()
+    memory = _state.memory
+    header = f"{'Aşama':28s} {'Adet':>7s} {'Toplam sn':>10s} {'Ort. ms':>9s} {'İşlemci sn':>10s}"
+    lines = [header + (f" {'Bellek MB':>9s}" if memory else "")]
+    for name, s in sorted(stats.items(), key=lambda item: -item[1]["wall_s"]):
+        mean = 1000.0 * s["wall_s"] / s["count"] if s["count"] else 0.0
+        line = f"{name:28s} {s['count']:7d} {s['wall_s']:10.3f} {mean:9.2f} {s['cpu_s']:10.3f}"
+        lines.append(line + (f" {s['alloc_max_bytes'] / 1e6:9.1f}" if memory else ""))
+    return "\n".join(lines)
+
+
+def add_arguments(parser):
+    # Komut satırı araçlarının ortak ölçüm seçenekleri
+    group = parser.add_argument_group("ölçüm")
+    group.add_argument("--profile", action="store_true", help="Aşama sürelerini ölç, özeti sonunda yaz")
+    group.add_argument("--trace", help="Aşama olaylarının yazılacağı Chrome iz dosyası (JSON)")
+    group.add_argument("--metrics", help="Aşama istatistiklerinin yazılacağı Prometheus metin dosyası")
+    group.add_argument("--metrics-port", type=int, help="Prometheus /metrics adresinin sunulacağı port")
+    group.add_argument("--profile-memory", action="store_true",
+                       help="Aşama başına bellek ayırmalarını da ölç (yavaştır)")
+
+
+def start_from_args(args):
+    # Seçeneklerden herhangi biri verildiyse ölçümü açar
+    if args.profile or args.trace or args.metrics or args.metrics_port is not None or args.profile_memory:
+        enable(memory=args.profile_memory)
+        if args.metrics_port is not None:
+            serve_prometheus(args.metrics_port)
+
+
+def finish_from_args(args, out=None):
+    # İz ve metrik dosyalarını yazar, özeti out'a basar
+    if not is_enabled():
+        return
+    if args.trace:
+        write_chrome_trace(args.trace)
+    if args.metrics:
+        write_prometheus(args.metrics)
+    if out is not None:
+        print(summary_table(), file=out)
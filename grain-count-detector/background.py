@@ -0,0 +1,38 @@
+from PIL import Image
+import numpy as np
+
+
+def gray_background_mask(rgb, gray_threshold=55):
+    # Kanalları birbirine yakın (gri) pikselleri bulan maske; r, g, b farkları
+    # taşma olmaması için int16 üzerinde hesaplanır
+    r = rgb[..., 0].astype(np.int16)
+    g = rgb[..., 1].astype(np.int16)
+    b = rgb[..., 2].astype(np.int16)
+    return ((np.abs(r - g) < gray_threshold)
+            & (np.abs(g - b) < gray_threshold)
+            & (np.abs(r - b) < gray_threshold))
+
+
+def remove_gray_background_array(rgba, gray_threshold=55, tile_rows=None):
+    # RGBA dizisinde gri pikselleri yerinde şeffaf yapar. tile_rows verilirse
+    # görüntü yatay şeritler halinde işlenir; ara diziler şerit boyutunda kalır.
+    height = rgba.shape[0]
+    step = tile_rows or height
+    for top in range(0, height, step):
+        band = rgba[top:top + step]
+        band[..., 3][gray_background_mask(band, gray_threshold)] = 0
+    return rgba
+
+
+def remove_gray_background(input_image_path, output_image_path, gray_threshold=55, tile_rows=None):
+    # Görüntüyü aç ve RGBA formatına çevir
+    image = Image.open(input_image_path).convert("RGBA")
+    pixels = np.array(image)
+
+    # Gri arka planı şeffaf yap
+    remove_gray_background_array(pixels, gray_threshold, tile_rows)
+
+    # Yeni alfa kanalı özgün görüntüye yazılır; böylece görüntü bilgileri (ör.
+    # icc_profile) korunur ve çıktı eski işlevle aynı olur
+    image.putalpha(Image.fromarray(pixels[..., 3]))
+    image.save(output_image_path, "PNG")
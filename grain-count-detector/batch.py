@@ -0,0 +1,199 @@
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import cv2
+import numpy as np
+
+import common_path  # noqa: F401
+import profiling
+from pipeline import FOREGROUNDS, count_kernels, load_image
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+
+# Tane alanı histogramının sınırları (piksel^2); son aralık üstten açıktır
+AREA_BINS = [100, 250, 500, 1000, 2000, 4000, 8000, 16000]
+
+# İşçi başına eşzamanlı bekleyen iş sayısı; bellek kullanımını sınırlar
+TASKS_PER_WORKER = 4
+
+
+def area_columns(bins=AREA_BINS):
+    edges = list(bins) + [None]
+    return [f"area_{lo}_{hi}" if hi is not None else f"area_{lo}_plus" for lo, hi in zip(edges, edges[1:])]
+
+
+def kernel_stats(count, areas, bins=AREA_BINS):
+    # Sayı, ortalama/medyan alan ve alan histogramı. areas tane başına olmalıdır;
+    # area modunda count_kernels kümeleri tahmini tanelere bölerek verir.
+    hist, _ = np.histogram(areas, bins=list(bins) + [np.inf])
+    stats = {
+        "count": count,
+        "mean_area": round(float(areas.mean()), 2) if len(areas) else 0.0,
+        "median_area": round(float(np.median(areas)), 2) if len(areas) else 0.0,
+    }
+    stats.update(zip(area_columns(bins), (int(h) for h in hist)))
+    return stats
+
+
+def process_image(image_path, remove_bg=True, gray_threshold=55, overlay_dir=None, mode="contour",
+                  single_area=None, foreground="gray", min_distance=None):
+    # Tek görüntüyü sayar; hata olursa satırda raporlanır, toplu iş durmaz
+    started = time.perf_counter()
+    row = {"file": image_path}
+    try:
+        # Kaplama görseli en pahalı adım olduğu için yalnızca istenirse çizilir
+        result = count_kernels(load_image(image_path), remove_bg=remove_bg,
+                               gray_threshold=gray_threshold, draw=overlay_dir is not None,
+                               mode=mode, single_area=single_area, foreground=foreground,
+                               min_distance=min_distance)
+        row.update(kernel_stats(result["count"], result["areas"]))
+        if overlay_dir is not None:
+            name = os.path.splitext(os.path.basename(image_path))[0] + "_output.png"
+            with profiling.stage("imwrite"):
+                cv2.imwrite(os.path.join(overlay_dir, name), result["output"])
+        row["error"] = ""
+    except Exception as e:
+        row["error"] = str(e)
+    row["seconds"] = round(time.perf_counter() - started, 4)
+    return row
+
+
+def _init_worker(profile):
+    # Ana süreçte ölçüm açıksa işçiler de ölçer ve olaylarını her satırla geri gönderir
+    profiling.enable(**profile)
+
+
+def _count_task(image_path, **options):
+    return process_image(image_path, **options), profiling.drain() if profiling.is_enabled() else None
+
+
+def iter_sources(sources):
+    # Dizin veya glob deseni; yollar tembel üretilir
+    for source in sources:
+        if os.path.isdir(source):
+            for name in sorted(os.listdir(source)):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield os.path.join(source, name)
+        elif glob.has_magic(source):
+            yield from sorted(glob.iglob(source, recursive=True))
+        else:
+            yield source
+
+
+def count_batch(image_paths, workers=None, **options):
+    # Görüntüleri süreç havuzunda sayar, satırları bitiş sırasıyla üretir
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for image_path in image_paths:
+            yield process_image(image_path, **options)
+        return
+
+    paths = iter(image_paths)
+    max_pending = workers * TASKS_PER_WORKER
+    profile = profiling.config()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker if profile else None,
+                             initargs=(profile,) if profile else ()) as executor:
+        pending = set()
+        try:
+            while True:
+                for image_path in paths:
+                    pending.add(executor.submit(_count_task, image_path, **options))
+                    if len(pending) >= max_pending:
+                        break
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    row, events = future.result()
+                    profiling.merge(events)
+                    yield row
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def fieldnames():
+    return ["file", "count", "mean_area", "median_area"] + area_columns() + ["seconds", "error"]
+
+
+def write_csv(rows, output_path):
+    stream = open(output_path, "w", encoding="utf-8", newline="") if output_path else sys.stdout
+    try:
+        writer = csv.DictWriter(stream, fieldnames=fieldnames())
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            stream.flush()
+            yield row
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+
+def write_parquet(rows, output_path):
+    # Parquet isteğe bağlıdır; pandas/pyarrow yalnızca bu çıktı için gerekir
+    import pandas as pd
+    collected = list(rows)
+    pd.DataFrame(collected, columns=fieldnames()).to_parquet(output_path, index=False)
+    return collected
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tepsi görüntülerindeki taneleri toplu olarak sayar.")
+    parser.add_argument("sources", nargs="+", help="Görüntü dizini veya glob deseni")
+    parser.add_argument("-o", "--output", help="İstatistik dosyası (.csv veya .parquet, varsayılan: stdout CSV)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="İşçi süreç sayısı")
+    parser.add_argument("--overlay-dir", help="Verilirse numaralı kaplama görselleri bu klasöre yazılır")
+    parser.add_argument("--gray-threshold", type=int, default=55)
+    parser.add_argument("--mode", choices=["contour", "watershed", "area"], default="contour",
+                        help="Sayım yöntemi: kontur, watershed ile ayırma veya alan tahmini")
+    parser.add_argument("--single-area", type=float, default=None,
+                        help="area modunda tek tane alanı (varsayılan: dışbükey konturların medyan alanı)")
+    parser.add_argument("--min-distance", type=int, default=None,
+                        help="watershed modunda tepeler arası en küçük uzaklık, piksel (varsayılan: "
+                             "tek tane yarıçapının yarısı; sık pirinçte 4 gibi küçük değerler)")
+    parser.add_argument("--foreground", choices=FOREGROUNDS, default="gray",
+                        help="Ön plan ayırma: gray (gri zemini sil, koyu eşik) veya chroma (zeminden renk "
+                             "farkı; açık zemindeki pirinç gibi açık taneler için)")
+    parser.add_argument("--no-remove-bg", action="store_true",
+                        help="Girdi görüntülerin arka planı zaten şeffaf")
+    profiling.add_arguments(parser)
+    args = parser.parse_args(argv)
+    profiling.start_from_args(args)
+
+    parquet = bool(args.output) and args.output.endswith(".parquet")
+    if parquet:
+        try:
+            import pandas  # noqa: F401
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("Parquet çıktısı için pandas ve pyarrow kurulu olmalıdır!")
+
+    if args.overlay_dir:
+        os.makedirs(args.overlay_dir, exist_ok=True)
+
+    rows = count_batch(iter_sources(args.sources), workers=args.workers,
+                       remove_bg=not args.no_remove_bg, gray_threshold=args.gray_threshold,
+                       overlay_dir=args.overlay_dir, mode=args.mode, single_area=args.single_area,
+                       foreground=args.foreground, min_distance=args.min_distance)
+    if parquet:
+        rows = write_parquet(rows, args.output)
+    else:
+        rows = write_csv(rows, args.output)
+
+    total = errors = 0
+    for row in rows:
+        total += 1
+        errors += bool(row["error"])
+    print(f"{total} görüntü işlendi, {errors} hata", file=sys.stderr)
+    profiling.finish_from_args(args, sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Projeler arasında paylaşılan modüller (ör. profiling) depo kökündeki common/
+# klasöründedir. Bu modülü içe aktarmak klasörü sys.path'e ekler; projeler kendi
+# klasörlerinden tek başına çalıştırılmaya devam eder.
+COMMON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common")
+if COMMON_DIR not in sys.path:
+    sys.path.append(COMMON_DIR)
@@ -0,0 +1,167 @@
+import os
+
+import cv2
+import numpy as np
+
+import common_path  # noqa: F401
+from background import remove_gray_background_array
+from profiling import profiled, stage
+from separation import (contour_areas, estimate_by_area, label_contours, single_kernel_area,
+                        split_cluster_areas, watershed_split)
+
+# Ön plan ayırma yöntemleri: "gray" gri zemini siler ve koyu eşikler (mısır gibi
+# renkli taneler), "chroma" zeminden renk farkıyla ayırır (açık zemindeki pirinç gibi
+# açık renkli taneler)
+FOREGROUNDS = ("gray", "chroma")
+
+
+@profiled("imread")
+def load_image(image_path):
+    # Görüntüyü alfa kanalıyla birlikte BGRA olarak oku
+    image = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError(f"Görüntü okunamadı: {image_path}")
+    if image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGRA)
+    if image.shape[2] == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+    return image
+
+
+@profiled()
+def remove_background(image, gray_threshold=55, tile_rows=None):
+    # Gri arka planı şeffaf yap. Gri testi r ve b'ye göre simetrik olduğundan
+    # BGRA sırası maskeyi değiştirmez; giriş dizisi kopyalanmadan güncellenir.
+    return remove_gray_background_array(image, gray_threshold, tile_rows)
+
+
+@profiled()
+def to_binary(image, blur_size=15, threshold=225):
+    # Şeffaf bölgeleri beyaz kabul ederek griye çevir, bulanıklaştır ve eşikle
+    gray = cv2.cvtColor(image[:, :, :3], cv2.COLOR_BGR2GRAY)
+    gray[image[:, :, 3] == 0] = 255  # Şeffaf bölgeleri beyaz yap
+    blurred = cv2.GaussianBlur(gray, (blur_size, blur_size), 0)
+    _, binary = cv2.threshold(blurred, threshold, 255, cv2.THRESH_BINARY_INV)
+    return binary
+
+
+@profiled()
+def chroma_binary(image, blur_sigma=2.0, weak_ratio=0.5):
+    # Açık zemindeki açık renkli taneler gri sayıldığından arka plan silme onları da
+    # siler, sabit koyu eşik de yakalamaz. Burada her pikselin Lab a/b düzleminde
+    # zeminin (medyan renk) rengine uzaklığı Otsu ile eşiklenir. Eşiği geçen
+    # bölgeler, eşiğin weak_ratio katını geçen komşu piksellere kadar büyütülür
+    # (histerezis); böylece tanelerin soluk kenarları da maskeye girer.
+    lab = cv2.cvtColor(np.ascontiguousarray(image[:, :, :3]), cv2.COLOR_BGR2LAB)
+    a = lab[:, :, 1].astype(np.float32)
+    b = lab[:, :, 2].astype(np.float32)
+    distance = cv2.GaussianBlur(cv2.magnitude(a - np.median(a), b - np.median(b)), (0, 0), blur_sigma)
+    scaled = cv2.normalize(distance, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    high, strong = cv2.threshold(scaled, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    _, weak = cv2.threshold(scaled, high * weak_ratio, 255, cv2.THRESH_BINARY)
+    count, labels = cv2.connectedComponents(weak)
+    keep = np.zeros(count, dtype=bool)
+    keep[labels[strong > 0]] = True
+    keep[0] = False
+    binary = keep[labels].astype(np.uint8) * 255
+    # JPEG renk bloklarından kalan küçük lekeler temizlenir
+    return cv2.morphologyEx(binary, cv2.MORPH_OPEN, np.ones((5, 5), np.uint8))
+
+
+@profiled()
+def separate_kernels(binary, kernel_size=5):
+    # Erozyon taneleri birbirinden ayırır, genişletme sınırlarını belirginleştirir
+    kernel = np.ones((kernel_size, kernel_size), np.uint8)
+    eroded = cv2.erode(binary, kernel, iterations=1)
+    return cv2.dilate(eroded, kernel, iterations=2)
+
+
+@profiled()
+def find_kernels(binary, min_area=100):
+    # Konturları bul ve küçük alanları yok say
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return [contour for contour in contours if cv2.contourArea(contour) > min_area]
+
+
+@profiled()
+def annotate(image, contours):
+    # Konturları ve sıra numaralarını görüntünün bir kopyası üzerine çiz
+    output = image.copy()
+    font = cv2.FONT_HERSHEY_SIMPLEX  # Yazı tipi
+    for count, contour in enumerate(contours, start=1):
+        cv2.drawContours(output, [contour], -1, (0, 255, 0), 2)
+
+        # Konturun merkezini hesapla
+        M = cv2.moments(contour)
+        if M["m00"] != 0:
+            cX = int(M["m10"] / M["m00"])
+            cY = int(M["m01"] / M["m00"])
+            cv2.putText(output, str(count), (cX - 10, cY - 10), font, 0.5, (0, 255, 0), 2)
+    return output
+
+
+@profiled()
+def count_kernels(image, remove_bg=True, gray_threshold=55, draw=True, debug_dir=None,
+                  mode="contour", single_area=None, foreground="gray", min_distance=None,
+                  min_height=None):
+    # Tüm aşamalar NumPy dizileri üzerinden ilerler; ara dosyalar yalnızca
+    # debug_dir verildiğinde yazılır.
+    # mode: "contour" (erozyon/genişletme sonrası kontur sayısı), "watershed"
+    # (mesafe tepeleri ile bitişik taneleri ayırır) veya "area" (küme alanı /
+    # tek tane alanı tahmini; single_area verilmezse dolu konturların medyan alanı).
+    # foreground: "gray" (gri zemini sil, koyu eşikle) veya "chroma" (zeminden renk
+    # farkı; remove_bg ve gray_threshold kullanılmaz). Açık zeminde sık pirinç
+    # için "chroma" ve "area" önerilir: kümeler ayrılamasa da alanlarından sayılır.
+    # area modunda "areas" tane başına alanlardır (her küme tahmini tane sayısına
+    # bölünür); kümelerin kendi alanları "cluster_areas" içindedir.
+    # min_distance/min_height: watershed tepe aralığı ve kenara en az uzaklığı (piksel);
+    # verilmezse tek tane alanından (single_area ya da dolu konturlar) türetilir.
+    if mode not in ("contour", "watershed", "area"):
+        raise ValueError(f"Geçersiz sayım modu: {mode}")
+    if foreground not in FOREGROUNDS:
+        raise ValueError(f"Geçersiz ön plan yöntemi: {foreground}")
+
+    def save_debug(name, img):
+        if debug_dir is not None:
+            os.makedirs(debug_dir, exist_ok=True)
+            cv2.imwrite(os.path.join(debug_dir, name), img)
+
+    if foreground == "chroma":
+        binary = chroma_binary(image)
+    else:
+        if remove_bg:
+            image = remove_background(image, gray_threshold)
+            save_debug("step_1_no_gray.png", image)
+        binary = to_binary(image)
+    save_debug("step_2_binary.png", binary)
+
+    if mode == "watershed":
+        # Morfolojik açma yalnızca gürültüyü temizler; kümeleri watershed ayırır
+        with stage("watershed"):
+            opened = cv2.morphologyEx(binary, cv2.MORPH_OPEN, np.ones((5, 5), np.uint8))
+            labels, kept, areas = watershed_split(opened, image, min_distance, min_height,
+                                                  single_area=single_area)
+        count = len(kept)
+        cluster_areas = areas
+        contours = []
+        if draw or debug_dir is not None:
+            with stage("label_contours"):
+                contours = label_contours(labels, kept)
+    else:
+        separated = separate_kernels(binary)
+        save_debug("step_3_morph.png", separated)
+        contours = find_kernels(separated)
+        cluster_areas = areas = contour_areas(contours)
+        count = len(contours)
+        if mode == "area":
+            if single_area is None:
+                single_area = single_kernel_area(contours)
+            count, single_area = estimate_by_area(cluster_areas, single_area)
+            areas = split_cluster_areas(cluster_areas, single_area)
+
+    output = annotate(image, contours) if draw else None
+    if output is not None:
+        save_debug("step_4_output.png", output)
+
+    return {"count": count, "contours": contours, "areas": areas, "cluster_areas": cluster_areas,
+            "output": output, "single_area": single_area}
@@ -0,0 +1,114 @@
+import cv2
+import numpy as np
+from scipy import ndimage
+
+
+def kernel_min_distance(binary, single_area=None, min_area=100):
+    # Tepe aralığı tipik tane yarıçapının yarısıdır; yarıçap tek tane alanından
+    # (verilmezse dolu konturların medyan alanından) bulunur. Böylece aralık
+    # görüntü çözünürlüğü ve tane boyuyla birlikte ölçeklenir.
+    if single_area is None:
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        single_area = single_kernel_area([c for c in contours if cv2.contourArea(c) > min_area])
+    if not single_area:
+        return 1
+    return max(int(round(0.5 * np.sqrt(single_area / np.pi))), 1)
+
+
+def distance_peaks(binary, min_distance, min_height=None):
+    # Mesafe dönüşümünün yerel tepeleri: her tepe bir tanenin merkezine karşılık gelir.
+    # min_distance içindeki daha küçük tepeler bastırılır; kenara min_height pikselden
+    # yakın tepeler (ince köprüler, gölge uçları) işaretleyici sayılmaz. Eşik mutlak
+    # olduğundan büyük bir kümenin derin merkezi küçük tanelerin tepelerini silmez.
+    if min_height is None:
+        min_height = max(min_distance / 2, 1.0)
+    dist = cv2.distanceTransform(binary, cv2.DIST_L2, 5)
+    size = 2 * min_distance + 1
+    local_max = cv2.dilate(dist, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (size, size)))
+    peaks = ((dist >= local_max) & (dist >= min_height)).astype(np.uint8)
+    # Plato üzerindeki komşu tepe piksellerini tek işaretleyicide topla
+    peaks = cv2.dilate(peaks, np.ones((3, 3), np.uint8))
+    count, markers = cv2.connectedComponents(peaks)
+    return dist, markers, count - 1
+
+
+def watershed_split(binary, image=None, min_distance=None, min_height=None, min_area=100,
+                    single_area=None):
+    # Bitişik taneleri mesafe tepeleri + watershed ile ayırır. min_distance verilmezse
+    # tek tane alanından türetilir (bkz. kernel_min_distance).
+    # Sonuç: etiket görüntüsü (0 arka plan, -1 sınır), alanı min_area üstündeki etiketler ve alanları
+    if min_distance is None:
+        min_distance = kernel_min_distance(binary, single_area, min_area)
+    dist, markers, _ = distance_peaks(binary, min_distance, min_height)
+
+    markers = markers.astype(np.int32) + 1  # Arka plan 1, bilinmeyen bölge 0 olacak
+    markers[(binary > 0) & (markers == 1)] = 0
+
+    # Renkli görüntü varsa sınırlar gerçek kenarlara oturur; yoksa ters mesafe yüzeyi kullanılır
+    if image is not None:
+        surface = np.ascontiguousarray(image[:, :, :3])
+    else:
+        relief = cv2.normalize(-dist, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+        surface = cv2.cvtColor(relief, cv2.COLOR_GRAY2BGR)
+    labels = cv2.watershed(surface, markers)
+    labels[labels == 1] = 0
+    labels[binary == 0] = 0
+
+    # Etiket alanları tek bincount ile hesaplanır
+    areas = np.bincount(labels[labels > 1].ravel())
+    kept = np.flatnonzero(areas > min_area)
+    return labels, kept, areas[kept].astype(np.float64)
+
+
+def label_contours(labels, kept):
+    # Çizim için her etiketin dış konturu (yalnızca kaplama istendiğinde çağrılır).
+    # Her etiket yalnızca kendi sınırlayıcı kutusu içinde aranır.
+    slices = ndimage.find_objects(np.maximum(labels, 0))
+    contours = []
+    for label in kept:
+        box = slices[label - 1]
+        if box is None:
+            continue
+        mask = (labels[box] == label).astype(np.uint8)
+        offset = (box[1].start, box[0].start)
+        found, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=offset)
+        if found:
+            contours.append(max(found, key=cv2.contourArea))
+    return contours
+
+
+def contour_areas(contours):
+    return np.array([cv2.contourArea(c) for c in contours], dtype=np.float64)
+
+
+def single_kernel_area(contours, min_solidity=0.9):
+    # Tek tane alanı: dışbükey (dolu) konturların medyan alanı. Bitişik tanelerden
+    # oluşan kümeler girintili olduğundan dışbükey zarflarını doldurmaz; sık
+    # tepsilerde kümelerin medyanı tek taneyi birkaç kat büyük gösterir.
+    # Dolu kontur yoksa tüm konturların medyanı kullanılır.
+    areas = contour_areas(contours)
+    if len(areas) == 0:
+        return None
+    hulls = np.array([cv2.contourArea(cv2.convexHull(c)) for c in contours], dtype=np.float64)
+    solid = areas >= min_solidity * hulls
+    return float(np.median(areas[solid] if solid.any() else areas))
+
+
+def estimate_by_area(areas, single_area=None):
+    # Her kümenin alanını tek tane alanına bölerek sayıyı tahmin eder.
+    # single_area verilmezse kümelerin medyan alanı tek tane alanı kabul edilir.
+    if len(areas) == 0:
+        return 0, 0.0
+    if single_area is None:
+        single_area = float(np.median(areas))
+    per_cluster = np.maximum(1, np.rint(areas / single_area))
+    return int(per_cluster.sum()), single_area
+
+
+def split_cluster_areas(areas, single_area):
+    # Her kümeyi tahmini tane sayısı kadar eşit parçaya böler; böylece alan
+    # istatistikleri kümeleri değil, estimate_by_area ile sayılan taneleri anlatır.
+    if len(areas) == 0 or not single_area:
+        return np.asarray(areas, dtype=np.float64)
+    per_cluster = np.maximum(1, np.rint(areas / single_area)).astype(np.int64)
+    return np.repeat(areas / per_cluster, per_cluster)
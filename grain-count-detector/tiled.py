@@ -0,0 +1,183 @@
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import common_path  # noqa: F401
+import profiling
+from pipeline import find_kernels, remove_background, separate_kernels, to_binary
+from separation import watershed_split
+
+# PNG/JPEG/TIFF gibi biçimler parça parça çözülemez, görüntünün tamamı belleğe
+# alınır. Bu sınırdan (piksel) büyük görüntüler çözülmeden reddedilir; bunlar
+# doğrudan .npy olarak verilmelidir (ör. tarayıcı yazılımından ham dışa aktarım).
+# Yaklaşık 400 MB BGRA.
+MAX_DECODE_PIXELS = 100_000_000
+
+
+def _header_size(path):
+    # Yalnızca dosya başlığı okunur; PIL'in tanımadığı biçimlerde None. Boyut
+    # denetimi burada max_pixels ile yapıldığından PIL'in kendi sınırı (görüntü
+    # çözülmediği için gereksiz) başlık okunurken kapatılır.
+    limit = Image.MAX_IMAGE_PIXELS
+    Image.MAX_IMAGE_PIXELS = None
+    try:
+        with Image.open(path) as image:
+            return image.size
+    except OSError:
+        return None
+    finally:
+        Image.MAX_IMAGE_PIXELS = limit
+
+
+@profiling.profiled()
+def open_image(source, max_pixels=MAX_DECODE_PIXELS):
+    # .npy dosyaları bellek eşlemeli açılır; yalnızca işlenen karo belleğe okunur.
+    # Diğer biçimler bir kez tamamen çözülür; max_pixels'ten büyükse (None veya 0
+    # ise sınır yok) bellek tükenmeden önce hata verilir.
+    if isinstance(source, np.ndarray):
+        return source
+    if source.lower().endswith(".npy"):
+        return np.load(source, mmap_mode="r")
+    size = _header_size(source) if max_pixels else None
+    if size is not None:
+        width, height = size
+        if width * height > max_pixels:
+            raise ValueError(f"{source}: {width}x{height} görüntü tek seferde çözülemeyecek kadar büyük "
+                             f"(sınır {max_pixels} piksel); görüntüyü .npy olarak verin")
+    image = cv2.imread(source, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError(f"Görüntü okunamadı: {source}")
+    return image
+
+
+@profiling.profiled()
+def convert_to_npy(image_path, npy_path, rows_per_chunk=1024, max_pixels=MAX_DECODE_PIXELS):
+    # Görüntüyü bellek eşlemeli .npy dosyasına yazar; aynı görüntünün sonraki
+    # sayımları sabit bellekle çalışır. Dönüşümün kendisi görüntüyü bir kez tamamen
+    # çözer, bu yüzden max_pixels sınırı burada da geçerlidir.
+    image = open_image(image_path, max_pixels)
+    out = np.lib.format.open_memmap(npy_path, mode="w+", dtype=image.dtype, shape=image.shape)
+    for top in range(0, image.shape[0], rows_per_chunk):
+        out[top:top + rows_per_chunk] = image[top:top + rows_per_chunk]
+    out.flush()
+    return npy_path
+
+
+def iter_tiles(height, width, tile_size, overlap):
+    # Her karo için (çekirdek bölge, kenar payıyla genişletilmiş bölge) döner.
+    # Çekirdek bölgeler görüntüyü örtüşmeden kaplar.
+    for top in range(0, height, tile_size):
+        for left in range(0, width, tile_size):
+            core = (top, min(top + tile_size, height), left, min(left + tile_size, width))
+            padded = (max(top - overlap, 0), min(top + tile_size + overlap, height),
+                      max(left - overlap, 0), min(left + tile_size + overlap, width))
+            yield core, padded
+
+
+def _to_bgra(tile):
+    if tile.ndim == 2:
+        return cv2.cvtColor(tile, cv2.COLOR_GRAY2BGRA)
+    if tile.shape[2] == 3:
+        return cv2.cvtColor(tile, cv2.COLOR_BGR2BGRA)
+    return np.array(tile)  # Bellek eşlemeli kaynağı değiştirmemek için kopya
+
+
+def _tile_kernels(tile, mode, min_area, min_distance=None):
+    # Karo içindeki tanelerin ağırlık merkezleri ve alanları
+    binary = to_binary(tile)
+    if mode == "watershed":
+        with profiling.stage("watershed"):
+            opened = cv2.morphologyEx(binary, cv2.MORPH_OPEN, np.ones((5, 5), np.uint8))
+            labels, kept, areas = watershed_split(opened, tile, min_distance, min_area=min_area)
+        # Etiket başına koordinat toplamları tek bincount ile bulunur
+        ys, xs = np.nonzero(labels > 1)
+        values = labels[ys, xs]
+        size = int(labels.max()) + 1
+        counts = np.bincount(values, minlength=size)[kept]
+        cx = np.bincount(values, weights=xs, minlength=size)[kept] / counts
+        cy = np.bincount(values, weights=ys, minlength=size)[kept] / counts
+        return np.stack([cx, cy], axis=1), areas
+
+    contours = find_kernels(separate_kernels(binary), min_area)
+    centroids = []
+    areas = []
+    for contour in contours:
+        M = cv2.moments(contour)
+        if M["m00"] == 0:
+            continue
+        centroids.append((M["m10"] / M["m00"], M["m01"] / M["m00"]))
+        areas.append(cv2.contourArea(contour))
+    return np.array(centroids, dtype=np.float64).reshape(-1, 2), np.array(areas, dtype=np.float64)
+
+
+@profiling.profiled()
+def count_tiled(source, tile_size=2048, overlap=256, remove_bg=True, gray_threshold=55,
+                mode="contour", min_area=100, max_pixels=MAX_DECODE_PIXELS, min_distance=None):
+    # Görüntüyü örtüşen karolar halinde sayar; bellekte aynı anda tek karo bulunur.
+    # Karo sınırını kesen taneler, ağırlık merkezi çekirdek bölgesinde olan karoya
+    # yazılır. overlap en büyük tane çapından büyük seçilmelidir; böylece her tane
+    # sahibi olan karoda kesilmeden görünür ve iki kez sayılmaz. min_distance
+    # verilmezse watershed tepe aralığı her karoda ayrı türetilir.
+    if mode not in ("contour", "watershed"):
+        raise ValueError(f"Karo modunda desteklenmeyen sayım modu: {mode}")
+
+    image = open_image(source, max_pixels)
+    height, width = image.shape[:2]
+
+    all_centroids = []
+    all_areas = []
+    for (cy0, cy1, cx0, cx1), (py0, py1, px0, px1) in iter_tiles(height, width, tile_size, overlap):
+        # Bellek eşlemeli kaynakta karonun diskten okunduğu yer burasıdır
+        with profiling.stage("tile_read"):
+            tile = _to_bgra(image[py0:py1, px0:px1])
+        if remove_bg:
+            remove_background(tile, gray_threshold)
+        centroids, areas = _tile_kernels(tile, mode, min_area, min_distance)
+        if len(centroids) == 0:
+            continue
+        centroids = centroids + (px0, py0)
+        inside = ((centroids[:, 0] >= cx0) & (centroids[:, 0] < cx1)
+                  & (centroids[:, 1] >= cy0) & (centroids[:, 1] < cy1))
+        all_centroids.append(centroids[inside])
+        all_areas.append(areas[inside])
+
+    centroids = np.concatenate(all_centroids) if all_centroids else np.zeros((0, 2))
+    areas = np.concatenate(all_areas) if all_areas else np.zeros(0)
+    return {"count": len(centroids), "centroids": centroids, "areas": areas}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Çok büyük görüntülerde karo karo tane sayımı.")
+    parser.add_argument("image", help="Görüntü veya bellek eşlemeli .npy dosyası")
+    parser.add_argument("--tile-size", type=int, default=2048)
+    parser.add_argument("--overlap", type=int, default=256, help="En büyük tane çapından büyük olmalı")
+    parser.add_argument("--mode", choices=["contour", "watershed"], default="contour")
+    parser.add_argument("--min-distance", type=int, default=None,
+                        help="watershed tepeleri arası en küçük uzaklık, piksel")
+    parser.add_argument("--gray-threshold", type=int, default=55)
+    parser.add_argument("--no-remove-bg", action="store_true")
+    parser.add_argument("--to-npy", help="Görüntüyü önce bu .npy dosyasına dönüştür ve onu say")
+    parser.add_argument("--max-pixels", type=int, default=MAX_DECODE_PIXELS,
+                        help=".npy dışındaki görüntüler için çözülebilecek en fazla piksel (0: sınırsız)")
+    profiling.add_arguments(parser)
+    args = parser.parse_args(argv)
+    profiling.start_from_args(args)
+
+    source = args.image
+    if args.to_npy:
+        source = convert_to_npy(args.image, args.to_npy, max_pixels=args.max_pixels)
+
+    result = count_tiled(source, args.tile_size, args.overlap, not args.no_remove_bg,
+                         args.gray_threshold, args.mode, max_pixels=args.max_pixels,
+                         min_distance=args.min_distance)
+    print(f"{os.path.basename(args.image)}: {result['count']} tane")
+    profiling.finish_from_args(args, sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+import cv2
+import numpy as np
+
+import common_path  # noqa: F401
+from detection import find_document_quad_proxy, order_points
+from layout import contour_corners, find_colored_contour, locate_regions
+from profiling import profiled, stage
+
+# Hizalamanın yapıldığı küçültülmüş görüntünün uzun kenarı (piksel)
+ALIGN_MAX_SIDE = 800
+
+# Homografi birim dönüşüme bu kadar (piksel) yakınsa form zaten hizalı kabul edilir
+IDENTITY_TOLERANCE = 1.0
+
+# Sayfa köşesi hizalamasında bulunan dörtgenin görüntüye oranı en az bu kadar
+# olmalı; daha küçük dörtgen kağıt değil, formun içindeki bir kutudur
+MIN_PAGE_RATIO = 0.3
+
+
+@profiled()
+def find_sheet_quads(sheet_img, layout, max_side=ALIGN_MAX_SIDE):
+    # Formdaki renkli bölgeleri küçültülmüş kopyada bulur, köşeleri ise tam
+    # çözünürlükte yalnızca her bölgenin çevresindeki küçük pencerede yeniden
+    # ölçer (küçük görüntünün piksel hatası homografiyi bozmasın diye)
+    height, width = sheet_img.shape[:2]
+    scale = max(max(height, width) / float(max_side), 1.0)
+    proxy = sheet_img
+    if scale > 1.0:
+        proxy = cv2.resize(sheet_img, (int(round(width / scale)), int(round(height / scale))),
+                           interpolation=cv2.INTER_AREA)
+    names = list(layout.regions)
+    contours = locate_regions(proxy, [layout.hsv_range(name) for name in names])
+
+    margin = int(np.ceil(scale)) * 4
+    quads = {}
+    for name, contour in zip(names, contours):
+        hsv_range = layout.hsv_range(name)
+        if scale == 1.0:
+            quads[name] = contour_corners(contour)
+            continue
+        x, y, w, h = (np.array(cv2.boundingRect(contour)) * scale).astype(int)
+        x0, y0 = max(x - margin, 0), max(y - margin, 0)
+        x1, y1 = min(x + w + margin, width), min(y + h + margin, height)
+        contour = find_colored_contour(sheet_img[y0:y1, x0:x1], hsv_range)
+        quads[name] = contour_corners(contour) + np.float32([x0, y0])
+    return quads
+
+
+def estimate_homography(sheet_img, layout, max_side=ALIGN_MAX_SIDE):
+    # Form -> şablon homografisi. Renkli bölgelerin dörder köşesi (standart formda
+    # 20 nokta) RANSAC ile eşleştirilir; tek bir bölgedeki hatalı köşe sonucu bozmaz.
+    sheet_quads = find_sheet_quads(sheet_img, layout, max_side)
+    src = np.concatenate([sheet_quads[name] for name in layout.regions]).astype("float32")
+    dst = np.concatenate([np.array(layout.quad(name), dtype="float32") for name in layout.regions])
+
+    with stage("find_homography"):
+        H, _ = cv2.findHomography(src, dst, cv2.RANSAC, 3.0)
+    if H is None:
+        raise ValueError("Form şablona hizalanamadı!")
+    return H
+
+
+@profiled()
+def estimate_page_homography(sheet_img, layout, max_side=ALIGN_MAX_SIDE):
+    # Renkli bölgeler bulunamadığında (ör. siyah-beyaz tarama veya fotokopi) form ->
+    # şablon homografisi kağıdın dört köşesinden bulunur; şablon tüm sayfayı kaplar.
+    corners = find_document_quad_proxy(sheet_img, max_side)
+    height, width = sheet_img.shape[:2]
+    if corners is None or cv2.contourArea(corners) < MIN_PAGE_RATIO * width * height:
+        raise ValueError("Formun sayfa köşeleri bulunamadı!")
+    w, h = layout.size
+    dst = np.array([[0, 0], [w - 1, 0], [w - 1, h - 1], [0, h - 1]], dtype="float32")
+    return cv2.getPerspectiveTransform(order_points(corners), dst)
+
+
+def is_identity(H, size, tolerance=IDENTITY_TOLERANCE):
+    # Şablon köşelerinin dönüşüm altında ne kadar kaydığına bak
+    width, height = size
+    corners = np.array([[[0, 0]], [[width, 0]], [[width, height]], [[0, height]]], dtype="float32")
+    moved = cv2.perspectiveTransform(corners, H)
+    return float(np.abs(moved - corners).max()) <= tolerance
+
+
+@profiled()
+def align_sheet(sheet_img, layout, max_side=ALIGN_MAX_SIDE):
+    # Formu şablon koordinatlarına taşır ve gri görüntü olarak döndürür. Form zaten
+    # hizalıysa (düz tarama) warp yapılmaz, yalnızca griye çevrilir.
+    H = estimate_homography(sheet_img, layout, max_side)
+    gray = cv2.cvtColor(sheet_img, cv2.COLOR_BGR2GRAY)
+    if sheet_img.shape[1::-1] == tuple(layout.size) and is_identity(H, layout.size):
+        return gray
+    with stage("warp"):
+        return cv2.warpPerspective(gray, H, tuple(layout.size), flags=cv2.INTER_LINEAR,
+                                   borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+
+
+@profiled()
+def align_windows(sheet_img, layout, windows, max_side=ALIGN_MAX_SIDE, page=False):
+    # align_sheet gibi, ama formun tamamı yerine yalnızca verilen şablon pencereleri
+    # (ad -> (x0, y0, x1, y1)) hizalanır: ad -> (karo, (x0, y0)). Okunan bölgeler
+    # formun küçük bir kısmı olduğundan tam sayfa warp ve griye çevirme yapılmaz.
+    # page verilirse renkli bölgeler yerine kağıdın köşeleri kullanılır.
+    if page:
+        H = estimate_page_homography(sheet_img, layout, max_side)
+    else:
+        H = estimate_homography(sheet_img, layout, max_side)
+    identity = sheet_img.shape[1::-1] == tuple(layout.size) and is_identity(H, layout.size)
+    tiles = {}
+    with stage("warp"):
+        for name, (x0, y0, x1, y1) in windows.items():
+            if identity:
+                tiles[name] = (sheet_img[y0:y1, x0:x1], (x0, y0))
+                continue
+            shift = np.array([[1, 0, -x0], [0, 1, -y0], [0, 0, 1]], dtype=np.float64)
+            tiles[name] = (cv2.warpPerspective(sheet_img, shift @ H, (x1 - x0, y1 - y0), flags=cv2.INTER_LINEAR,
+                                               borderMode=cv2.BORDER_CONSTANT, borderValue=(255, 255, 255)),
+                           (x0, y0))
+    return tiles
@@ -0,0 +1,226 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+
+import common_path  # noqa: F401
+import profiling
+from engine import ANSWERS_REGION, GROUP_REGION, grade_forms
+from examstore import PENDING_FILE, ExamStore, append_pending, read_pending
+from layout import load_template_layout
+from resultcache import DEFAULT_MAX_ENTRIES, ResultCache
+from sheetio import expand_source
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".pdf")
+
+CSV_FIELDS = ["file", "student_number", "exam_type", "group", "semester",
+              "answers", "correct", "wrong", "blank", "aligned", "confidence", "review", "error"]
+
+
+def result_fields(layout):
+    # Sütunlar şemadaki bölgelerden gelir; standart formda CSV_FIELDS ile aynıdır
+    return ["file"] + list(layout.regions) + ["correct", "wrong", "blank", "aligned", "confidence", "review",
+                                              "error"]
+
+
+def load_answer_key(path):
+    # JSON: {"A": "ACDEE...", "B": ["A", "C", ...]} ya da satır başına "A: ACDEE..."
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = {}
+        for line in text.splitlines():
+            if ":" in line:
+                group, answers = line.split(":", 1)
+                data[group.strip()] = answers.strip()
+    return {group: [a for a in answers if a.strip(", ")] for group, answers in data.items()}
+
+
+def iter_sources(sources):
+    # Çok sayfalı TIFF/PDF tarayıcı çıktıları sayfa adlarına ("toplu.tif#3") açılır
+    for path in _iter_paths(sources):
+        yield from expand_source(path)
+
+
+def _iter_paths(sources):
+    # Dizin, glob deseni veya "-" (stdin'den satır satır yol listesi) kabul edilir.
+    # Yollar tembel üretilir; liste hiçbir zaman tamamen belleğe alınmaz.
+    for source in sources:
+        if source == "-":
+            for line in sys.stdin:
+                line = line.strip()
+                if line:
+                    yield line
+        elif os.path.isdir(source):
+            names = sorted(e.name for e in os.scandir(source) if e.is_file())
+            for name in names:
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield os.path.join(source, name)
+        elif glob.has_magic(source):
+            for path in sorted(glob.iglob(source, recursive=True)):
+                yield path
+        else:
+            yield source
+
+
+def load_checkpoint(path):
+    # Daha önce tamamlanan dosyaların yolları (satır başına bir yol)
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def skip_done(paths, done):
+    for path in paths:
+        if path not in done:
+            yield path
+
+
+def to_row(optic_path, result, error, fields=CSV_FIELDS):
+    row = {"file": optic_path, "error": error or ""}
+    if result is not None:
+        for key in fields[1:-1]:
+            row[key] = result[key]
+    return row
+
+
+class RowWriter:
+    def __init__(self, stream, fmt, write_header, fields=CSV_FIELDS):
+        self.stream = stream
+        self.fmt = fmt
+        if fmt == "csv":
+            self.writer = csv.DictWriter(stream, fieldnames=fields)
+            if write_header:
+                self.writer.writeheader()
+
+    def write(self, row):
+        if self.fmt == "csv":
+            self.writer.writerow({key: " ".join(value) if isinstance(value, list) else value
+                                  for key, value in row.items()})
+        else:
+            self.stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+
+def open_pending(directory, append=False):
+    # Kaldığı yerden devam eden çalışmada önceki çalışmanın bekleyen formları korunur
+    os.makedirs(directory, exist_ok=True)
+    return open(os.path.join(directory, PENDING_FILE), "a" if append else "w", encoding="utf-8")
+
+
+def write_matrix(directory, layout, append=False):
+    # Bekleyen formların cevaplarını N x soru uint8 matris olarak kaydet; kaldığı
+    # yerden devam eden çalışmada mevcut deponun sonuna eklenir
+    store = ExamStore.from_results(read_pending(directory), layout.labels(ANSWERS_REGION),
+                                   layout.labels(GROUP_REGION), layout.item_count(ANSWERS_REGION),
+                                   ANSWERS_REGION, GROUP_REGION)
+    if append and os.path.exists(os.path.join(directory, "index.json")):
+        store = ExamStore.load(directory, mmap_mode=None).concat(store)
+    store.save(directory)
+    os.remove(os.path.join(directory, PENDING_FILE))
+
+
+def run(args):
+    profiling.start_from_args(args)
+    layout = load_template_layout(args.template, schema_path=args.schema)
+    fields = result_fields(layout)
+    answer_key_map = load_answer_key(args.answer_key)
+
+    done = load_checkpoint(args.checkpoint)
+    if done:
+        print(f"Kaldığı yerden devam ediliyor: {len(done)} form atlanacak", file=sys.stderr)
+    paths = skip_done(iter_sources(args.sources), done)
+
+    if args.output:
+        # Devam eden çalışmada çıktı dosyasının sonuna eklenir
+        append = bool(done) and os.path.exists(args.output)
+        stream = open(args.output, "a" if append else "w", encoding="utf-8", newline="")
+        write_header = not append
+    else:
+        stream = sys.stdout
+        write_header = True
+    checkpoint = open(args.checkpoint, "a", encoding="utf-8") if args.checkpoint else None
+    # İnceleme kuyruğu: yalnızca güveni düşük maddesi olan veya hizalanamayan formlar (JSONL)
+    review_queue = open(args.review_queue, "a", encoding="utf-8") if args.review_queue else None
+    cache = ResultCache(args.cache, args.cache_size) if args.cache else None
+    # Sütunsal sonuç deposu için yalnızca başarılı okumalar biriktirilir
+    pending = open_pending(args.matrix, append=bool(done)) if args.matrix else None
+
+    writer = RowWriter(stream, args.format, write_header, fields)
+    count = errors = reviews = 0
+    try:
+        for optic_path, result, error in grade_forms(args.template, paths, answer_key_map,
+                                                     workers=args.workers, layout=layout,
+                                                     align=not args.no_align, cache=cache):
+            writer.write(to_row(optic_path, result, error, fields))
+            if pending is not None and result is not None:
+                append_pending(pending, result, ANSWERS_REGION, GROUP_REGION)
+            if result is not None and result["review"]:
+                reviews += 1
+                if review_queue is not None:
+                    review_queue.write(json.dumps({"file": optic_path, "aligned": result["aligned"],
+                                                   "confidence": result["confidence"],
+                                                   "review": result["review"]}, ensure_ascii=False) + "\n")
+                    review_queue.flush()
+            # Satır yazıldıktan sonra işaretlenir; çökme anında sonuç kaybolmaz
+            if checkpoint is not None:
+                checkpoint.write(optic_path + "\n")
+                checkpoint.flush()
+            count += 1
+            errors += error is not None
+    finally:
+        if pending is not None:
+            pending.close()
+        if checkpoint is not None:
+            checkpoint.close()
+        if review_queue is not None:
+            review_queue.close()
+        if cache is not None:
+            cache.close()
+        if stream is not sys.stdout:
+            stream.close()
+
+    if pending is not None:
+        write_matrix(args.matrix, layout, append=bool(done))
+
+    print(f"{count} form işlendi, {errors} hata, {reviews} form incelemeye gönderildi", file=sys.stderr)
+    if cache is not None:
+        print(f"Önbellek: {cache.hits} form tekrar okunmadı, {cache.misses} yeni okuma", file=sys.stderr)
+    profiling.finish_from_args(args, sys.stderr)
+    return 1 if errors else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Optik formları toplu olarak puanlar.")
+    parser.add_argument("sources", nargs="+",
+                        help="Form dizini, glob deseni (ör. 'taramalar/*.png') veya stdin için '-'")
+    parser.add_argument("-t", "--template", required=True, help="Şablon görüntüsü (TEMPLATE.png)")
+    parser.add_argument("-s", "--schema",
+                        help="Form düzeni şeması (varsayılan: şablonun yanındaki <ad>.schema.json veya standart form)")
+    parser.add_argument("-k", "--answer-key", required=True,
+                        help='Cevap anahtarı: JSON ({"A": "ACDE..."}) veya satır başına "A: ACDE..."')
+    parser.add_argument("-o", "--output", help="Çıktı dosyası (varsayılan: stdout)")
+    parser.add_argument("-f", "--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="İşçi süreç sayısı (varsayılan: çekirdek sayısı)")
+    parser.add_argument("--no-align", action="store_true",
+                        help="Formları şablona hizalamadan oku (piksel hizalı taramalar için)")
+    parser.add_argument("-r", "--review-queue",
+                        help="Güveni düşük maddesi olan veya hizalanamayan formların yazılacağı inceleme "
+                             "kuyruğu (JSONL)")
+    parser.add_argument("--cache", help="Okuma önbelleği (SQLite); aynı form tekrar gelirse yeniden okunmaz")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="Önbellekte tutulacak en fazla form sayısı (en eski kullanılanlar silinir)")
+    parser.add_argument("-m", "--matrix",
+                        help="Cevapların sütunsal olarak kaydedileceği klasör (examstore.py ile analiz için)")
+    parser.add_argument("-c", "--checkpoint", help="Tamamlanan dosyaların kaydedildiği ilerleme dosyası")
+    profiling.add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(run(parse_args()))
@@ -0,0 +1,238 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import common_path  # noqa: F401
+import profiling
+from align import align_windows
+from layout import TemplateLayout, load_template_layout
+from scoring import (adaptive_thresholds, check_answers, decode_region, read_tiles, region_tiles, review_items,
+                     sample_windows)
+from sheetio import load_sheet, source_key
+
+# Puanlamada kullanılan bölgelerin şemadaki adları
+ANSWERS_REGION = "answers"
+GROUP_REGION = "group"
+
+# Bilinen bölgelerin ekranda gösterilen adları; diğerleri şemadaki adıyla gösterilir
+FIELD_TITLES = {
+    "student_number": "Öğrenci Numarası",
+    "exam_type": "Sınav Türü",
+    "group": "Grup",
+    "semester": "Dönem",
+    "answers": "Cevaplar",
+}
+
+# Okuma mantığı (hizalama, eşikleme, çözme) değiştiğinde artırılır; okuma
+# önbelleğindeki eski kayıtlar bu sayede kullanılmaz
+READER_VERSION = 2
+
+# Form hizalanamadığında inceleme listesine eklenen madde
+ALIGN_REVIEW_ITEM = "hizalama"
+
+# Havuz başına eşzamanlı bekleyen iş sayısı (işçi başına); bellek kullanımını sınırlar
+TASKS_PER_WORKER = 4
+
+# İptal olayı verildiğinde, sonuç beklenirken iptalin kontrol edilme aralığı (saniye)
+CANCEL_CHECK_INTERVAL = 0.1
+
+# İşçi süreçlerde bir kez kurulan durum (şablon düzeni ve hizalama ayarı)
+_worker_state = {}
+
+
+@profiling.profiled()
+def read_sheet(optic_img, layout, align=True):
+    # Formu okur ama puanlamaz; sonuç yalnızca görüntüye ve şablona bağlıdır, bu
+    # yüzden önbelleğe alınabilir. Eğik/ölçekli formlar önce renkli bölgelerle şablon
+    # koordinatlarına hizalanır; bölgeler bulunamazsa (ör. siyah-beyaz tarama) kağıdın
+    # köşeleri denenir. İkisi de olmazsa form şablonla hizalı kabul edilir ve
+    # incelemeye gönderilir. Yalnızca bölge pencereleri hizalanır ve okunur.
+    # "aligned": "regions", "page" veya "none" (hizalama istenmediyse de "none")
+    tiles = None
+    aligned = "none"
+    if align:
+        windows = sample_windows(layout)
+        for method in ("regions", "page") if optic_img.ndim == 3 else ("page",):
+            try:
+                tiles = align_windows(optic_img, layout, windows, page=method == "page")
+            except ValueError:
+                continue
+            aligned = method
+            break
+    if tiles is None:
+        tiles = region_tiles(optic_img, layout)
+
+    # Tüm bölgelerin yuvarlakları tek geçişte örneklenir, eşikler forma ve maddeye
+    # göre uyarlanır ve bölgeler şemadaki türlerine göre çözülür (ör. numara/cevaplar
+    # dizge, sınav türü/grup/dönem etiket)
+    intensities = read_tiles(tiles, layout)
+    with profiling.stage("decode"):
+        levels = adaptive_thresholds(intensities)
+        result = {name: decode_region(layout, name, values, levels[name][0])
+                  for name, values in intensities.items()}
+    confidences = {name: levels[name][1] for name in intensities}
+
+    review = review_items(confidences)
+    if align and aligned == "none":
+        review.insert(0, ALIGN_REVIEW_ITEM)
+    result.update({
+        "aligned": aligned,
+        # Formun en düşük madde güveni ve incelenmesi gereken maddeler
+        "confidence": round(min(min(c) if isinstance(c, list) else c for c in confidences.values()), 3),
+        "review": review,
+    })
+    return result
+
+
+def score_sheet(reading, answer_key_map):
+    # Ham okumayı cevap anahtarına göre puanlar
+    result = dict(reading)
+    correct, wrong, blank = check_answers(result.get(ANSWERS_REGION, ""), result.get(GROUP_REGION),
+                                          answer_key_map)
+    result.update({"correct": correct, "wrong": wrong, "blank": blank})
+    return result
+
+
+def grade_image(optic_img, layout, answer_key_map, align=True):
+    return score_sheet(read_sheet(optic_img, layout, align), answer_key_map)
+
+
+def cache_key(cache, optic_path, layout, align=True):
+    # Görüntü (veya belge sayfası) içeriği + derlenmiş şablon (şablon ve şema) +
+    # okuma sürümü + hizalama
+    return source_key(cache, optic_path, layout.template_hash, READER_VERSION, int(align))
+
+
+def _read_image(optic_path, layout, align=True):
+    # Hizalama yapılmayacaksa renk gerekmez, form doğrudan gri çözülür; şablondan
+    # büyük taramalar biçim izin verdiğinde çözme sırasında küçültülür
+    return load_sheet(optic_path, tuple(layout.size), color=align)
+
+
+def process_optic_form(template_path, optic_path, answer_key_map, layout=None, align=True, cache=None):
+    # Şablon düzeni verilmediyse önbellekten yüklenir (gerekirse bir kez derlenir).
+    # Okuma önbelleği verilirse aynı form tekrar okunmaz, yalnızca yeniden puanlanır.
+    if layout is None:
+        layout = load_template_layout(template_path)
+
+    key = cache_key(cache, optic_path, layout, align) if cache is not None else None
+    reading = cache.get(key) if key is not None else None
+    if reading is None:
+        reading = read_sheet(_read_image(optic_path, layout, align), layout, align)
+        if key is not None:
+            cache.put(key, reading)
+
+    result = score_sheet(reading, answer_key_map)
+    result["file_name"] = os.path.basename(optic_path)
+    return result
+
+
+def _init_worker(layout_data, align=True, profile=None):
+    # Şablon her işe değil, her işçi sürece bir kez gönderilir. profile verilirse
+    # (ana süreçte ölçüm açık) işçi de ölçer ve olaylarını her işle geri gönderir.
+    _worker_state["layout"] = TemplateLayout.from_dict(layout_data)
+    _worker_state["align"] = align
+    _worker_state["profile"] = profile is not None
+    if profile is not None:
+        profiling.enable(**profile)
+
+
+def _read_task(optic_path):
+    # Hatalar dosya bazında yakalanır; bir formdaki sorun diğerlerini etkilemez
+    try:
+        layout, align = _worker_state["layout"], _worker_state["align"]
+        reading = read_sheet(_read_image(optic_path, layout, align), layout, align)
+        item = optic_path, reading, None
+    except Exception as e:
+        item = optic_path, None, str(e)
+    return item + (profiling.drain() if _worker_state["profile"] else None,)
+
+
+def _read_forms(optic_paths, layout, workers, align, cache, cancel_event=None):
+    # Formları okur (puanlamaz) ve (dosya yolu, okuma, hata) üretir. Önbellekte
+    # bulunanlar havuza hiç gönderilmeden hemen döner; yeni okumalar önbelleğe yazılır.
+    # cancel_event (threading.Event) kurulduğunda yeni form gönderilmez, işlenmekte
+    # olanların sonucu beklenmez.
+    def cancelled():
+        return cancel_event is not None and cancel_event.is_set()
+
+    def lookup(optic_path):
+        if cache is None:
+            return None, None
+        key = cache_key(cache, optic_path, layout, align)
+        return key, (cache.get(key) if key is not None else None)
+
+    def store(key, item):
+        if key is not None and item[1] is not None:
+            cache.put(key, item[1])
+        return item
+
+    if workers == 1:
+        _init_worker(layout.to_dict(), align)
+        for optic_path in optic_paths:
+            if cancelled():
+                return
+            key, reading = lookup(optic_path)
+            if reading is not None:
+                yield optic_path, reading, None
+            else:
+                yield store(key, _read_task(optic_path)[:3])
+        return
+
+    paths = iter(optic_paths)
+    max_pending = workers * TASKS_PER_WORKER
+    timeout = CANCEL_CHECK_INTERVAL if cancel_event is not None else None
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(layout.to_dict(), align, profiling.config()))
+    pending = {}
+
+    def submit_more():
+        # Bekleyen iş sınırına kadar yeni iş gönder; tüm liste belleğe alınmaz.
+        # Önbellekte bulunan formlar doğrudan üretilir.
+        for optic_path in paths:
+            if cancelled():
+                return
+            key, reading = lookup(optic_path)
+            if reading is not None:
+                yield optic_path, reading, None
+                continue
+            pending[executor.submit(_read_task, optic_path)] = key
+            if len(pending) >= max_pending:
+                break
+
+    try:
+        yield from submit_more()
+        while pending and not cancelled():
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                *item, events = future.result()
+                profiling.merge(events)
+                yield store(pending.pop(future), tuple(item))
+            yield from submit_more()
+    finally:
+        # Üretici erken kapatılırsa henüz başlamamış işler düşürülür; iptal
+        # edildiyse işlenmekte olan formlar da beklenmez
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=not cancelled())
+
+
+def grade_forms(template_path, optic_paths, answer_key_map, workers=None, layout=None, align=True, cache=None,
+                cancel_event=None):
+    # Formları süreç havuzunda okuyup puanlar ve sonuçları bitiş sırasıyla üretir:
+    # (dosya yolu, sonuç, hata) — sonuç veya hatadan yalnızca biri doludur.
+    # cache (ResultCache) verilirse tekrar gönderilen formlar yeniden okunmaz.
+    # cancel_event kurulduğunda üretim bir sonraki form gönderilmeden durur.
+    if layout is None:
+        layout = load_template_layout(template_path)
+    answer_key_map = dict(answer_key_map)
+    workers = workers or os.cpu_count() or 1
+    if hasattr(optic_paths, "__len__"):
+        workers = max(1, min(workers, len(optic_paths)))
+
+    for optic_path, reading, error in _read_forms(optic_paths, layout, workers, align, cache, cancel_event):
+        if error is not None:
+            yield optic_path, None, error
+            continue
+        result = score_sheet(reading, answer_key_map)
+        result["file_name"] = os.path.basename(optic_path)
+        yield optic_path, result, None
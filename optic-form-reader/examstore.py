@@ -0,0 +1,236 @@
+import argparse
+import csv
+import json
+import os
+import sys
+
+import numpy as np
+
+# Cevap matrisindeki kodlar: 0 boş, 1..K seçenek sırası + 1, 255 çoklu işaret
+BLANK = 0
+MULTIPLE = 255
+
+ANSWERS_FILE = "answers.npy"
+GROUPS_FILE = "groups.npy"
+INDEX_FILE = "index.json"
+# Depoya henüz eklenmemiş formlar (JSONL); her form okunur okunmaz eklenir, böylece
+# yarıda kalan çalışmanın formları kaldığı yerden devam edildiğinde kaybolmaz
+PENDING_FILE = "pending.jsonl"
+
+
+def encode_answers(answers, choices):
+    # "ACXM..." dizgesini uint8 koda çevir (X boş, M çoklu, diğerleri seçenek)
+    codes = {label: i + 1 for i, label in enumerate(choices)}
+    codes["X"] = BLANK
+    codes["M"] = MULTIPLE
+    return np.array([codes.get(a, BLANK) for a in answers], dtype=np.uint8)
+
+
+def encode_keys(answer_key_map, choices, group_labels, questions):
+    # Grup başına cevap anahtarı matrisi, (grup sayısı + 1, soru sayısı). 0. satır
+    # bilinmeyen grup içindir; 0 kodu o sorunun anahtarda olmadığını gösterir.
+    keys = np.zeros((len(group_labels) + 1, questions), dtype=np.uint8)
+    for g, group in enumerate(group_labels):
+        key = answer_key_map.get(group) or []
+        keys[g + 1, :len(key)] = encode_answers(key[:questions], choices)
+    return keys
+
+
+def append_pending(stream, result, answers_field="answers", group_field="group"):
+    # from_results'in kullandığı alanlar satır olarak yazılır
+    row = {key: result.get(key) for key in ("file_name", "student_number", answers_field, group_field)}
+    stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+    stream.flush()
+
+
+def read_pending(directory):
+    # Çökme anında yarım yazılmış son satır atlanır; o formun ilerleme kaydı da
+    # yazılmadığından form tekrar okunur
+    rows = []
+    path = os.path.join(directory, PENDING_FILE)
+    if not os.path.exists(path):
+        return rows
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                continue
+    return rows
+
+
+class ExamStore:
+    # Sınavın tüm formları sütunsal olarak: N x soru uint8 cevap matrisi, N grup kodu
+    # (0 bilinmiyor) ve satır sırasıyla kimlik dizini (dosya, öğrenci numarası).
+    # Puanlama ve madde analizleri tüm sınav üzerinde vektörel çalışır; cevap
+    # anahtarı düzeltildiğinde görüntüler tekrar okunmaz.
+
+    def __init__(self, answers, groups, index, choices, group_labels):
+        self.answers = answers
+        self.groups = groups
+        self.index = index
+        self.choices = list(choices)
+        self.group_labels = list(group_labels)
+
+    def __len__(self):
+        return len(self.groups)
+
+    @property
+    def questions(self):
+        return self.answers.shape[1]
+
+    @classmethod
+    def from_results(cls, results, choices, group_labels, questions, answers_field="answers",
+                     group_field="group"):
+        # results: engine sonuç sözlükleri (hatalı formlar önceden ayıklanmış olmalı)
+        group_codes = {label: i + 1 for i, label in enumerate(group_labels)}
+        rows, groups, index = [], [], []
+        for result in results:
+            row = np.zeros(questions, dtype=np.uint8)
+            encoded = encode_answers(result[answers_field], choices)[:questions]
+            row[:len(encoded)] = encoded
+            rows.append(row)
+            groups.append(group_codes.get(result.get(group_field), 0))
+            index.append([result.get("file_name", ""), result.get("student_number", "")])
+        answers = np.array(rows, dtype=np.uint8).reshape(-1, questions)
+        return cls(answers, np.array(groups, dtype=np.uint8), index, choices, group_labels)
+
+    def concat(self, other):
+        if other.choices != self.choices or other.group_labels != self.group_labels:
+            raise ValueError("Birleştirilen sonuçların seçenekleri veya grupları farklı!")
+        if other.questions != self.questions:
+            raise ValueError(f"Soru sayıları farklı: {self.questions} ve {other.questions}")
+        return ExamStore(np.concatenate([self.answers, other.answers]),
+                         np.concatenate([self.groups, other.groups]),
+                         self.index + other.index, self.choices, self.group_labels)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, ANSWERS_FILE), np.ascontiguousarray(self.answers))
+        np.save(os.path.join(directory, GROUPS_FILE), np.ascontiguousarray(self.groups))
+        with open(os.path.join(directory, INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump({"choices": self.choices, "groups": self.group_labels, "sheets": self.index},
+                      f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        # Matrisler bellek eşlemeli açılır; yalnızca dokunulan sayfalar okunur
+        try:
+            answers = np.load(os.path.join(directory, ANSWERS_FILE), mmap_mode=mmap_mode)
+            groups = np.load(os.path.join(directory, GROUPS_FILE), mmap_mode=mmap_mode)
+            with open(os.path.join(directory, INDEX_FILE), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"Sonuç deposu açılamadı ({directory}): {e}")
+        return cls(answers, groups, meta["sheets"], meta["choices"], meta["groups"])
+
+    def keys(self, answer_key_map):
+        return encode_keys(answer_key_map, self.choices, self.group_labels, self.questions)
+
+    def correctness(self, answer_key_map):
+        # (doğru mu, anahtarda var mı) boolean matrisleri, N x soru
+        keys = self.keys(answer_key_map)[self.groups]
+        keyed = keys != 0
+        return (self.answers == keys) & keyed, keyed
+
+    def score(self, answer_key_map):
+        # check_answers ile aynı kurallar: çoklu işaret yanlış, grubun anahtarı
+        # yoksa tüm sorular boş sayılır. Dönüş: doğru, yanlış, boş dizileri (N)
+        correct, keyed = self.correctness(answer_key_map)
+        answered = self.answers != BLANK
+        no_key = ~keyed.any(axis=1)
+        wrong = (answered & keyed & ~correct).sum(axis=1)
+        blank = (~answered & keyed).sum(axis=1)
+        blank[no_key] = self.questions
+        return correct.sum(axis=1), wrong, blank
+
+    def histogram(self, answer_key_map):
+        # Doğru sayısı -> form sayısı
+        correct, _, _ = self.score(answer_key_map)
+        return np.bincount(correct, minlength=self.questions + 1)
+
+    def item_stats(self, answer_key_map, group=None):
+        # Madde güçlüğü (doğru oranı) ve ayırt edicilik (madde ile kalan puan
+        # arasındaki nokta-çift serili korelasyon). Anahtarı olmayan formlar dışarıda.
+        # Soru sırası gruplar arasında farklı olabildiğinden grup verilirse yalnızca
+        # o grubun formları kullanılır; grupsuz sonuç aynı numaralı soruları karıştırır.
+        correct, keyed = self.correctness(answer_key_map)
+        scored = keyed.any(axis=1)
+        if group is not None:
+            scored &= self.groups == self.group_labels.index(group) + 1
+        correct = correct[scored].astype(np.float64)
+        keyed = keyed[scored]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            difficulty = correct.sum(axis=0) / keyed.sum(axis=0)
+            rest = correct.sum(axis=1, keepdims=True) - correct
+            item = correct - correct.mean(axis=0)
+            rest = rest - rest.mean(axis=0)
+            discrimination = (item * rest).sum(axis=0) / np.sqrt((item ** 2).sum(axis=0) * (rest ** 2).sum(axis=0))
+        return {"difficulty": difficulty, "discrimination": discrimination}
+
+    def distractors(self, group=None):
+        # Soru x [boş, seçenekler..., çoklu] işaretlenme sayıları; grup verilirse
+        # yalnızca o grubun formları (seçenek sırası gruplar arasında farklı olabilir)
+        answers = self.answers
+        if group is not None:
+            answers = answers[self.groups == self.group_labels.index(group) + 1]
+        codes = answers.astype(np.int64)
+        codes[codes == MULTIPLE] = len(self.choices) + 1
+        width = len(self.choices) + 2
+        offsets = np.arange(self.questions) * width
+        counts = np.bincount((codes + offsets).ravel(), minlength=self.questions * width)
+        return counts.reshape(self.questions, width)
+
+
+def _print_report(store, answer_key_map, out=sys.stdout):
+    correct, wrong, blank = store.score(answer_key_map)
+    print(f"Form sayısı: {len(store)}, soru sayısı: {store.questions}", file=out)
+    if len(store):
+        print(f"Ortalama doğru: {correct.mean():.2f}, ortanca: {np.median(correct):.0f}", file=out)
+
+    print("\nDoğru sayısı dağılımı:", file=out)
+    histogram = store.histogram(answer_key_map)
+    peak = max(int(histogram.max()), 1)
+    for score, count in enumerate(histogram):
+        print(f"{score:4d} {count:7d} {'#' * int(round(40 * count / peak))}", file=out)
+
+    header = ["Boş"] + store.choices + ["Çoklu"]
+    for group in store.group_labels:
+        if not answer_key_map.get(group):
+            continue
+        stats = store.item_stats(answer_key_map, group)
+        print(f"\nGrup {group} — madde analizi:", file=out)
+        print("Soru  Anahtar  Güçlük  Ayırt  " + " ".join(f"{h:>6s}" for h in header), file=out)
+        counts = store.distractors(group)
+        key = answer_key_map[group]
+        for q in range(store.questions):
+            answer = key[q] if q < len(key) else "-"
+            print(f"{q + 1:4d}  {answer:>7s}  {stats['difficulty'][q]:6.2f}  {stats['discrimination'][q]:5.2f}  "
+                  + " ".join(f"{c:6d}" for c in counts[q]), file=out)
+
+
+def main(argv=None):
+    from cli import load_answer_key
+
+    parser = argparse.ArgumentParser(description="Sonuç deposundan sınav geneli puanlama ve madde analizi.")
+    parser.add_argument("store", help="cli.py --matrix ile yazılan sonuç deposu klasörü")
+    parser.add_argument("-k", "--answer-key", required=True, help="Cevap anahtarı (cli.py ile aynı biçim)")
+    parser.add_argument("-o", "--output", help="Form başına puanların yazılacağı CSV dosyası")
+    args = parser.parse_args(argv)
+
+    store = ExamStore.load(args.store)
+    answer_key_map = load_answer_key(args.answer_key)
+    _print_report(store, answer_key_map)
+
+    if args.output:
+        correct, wrong, blank = store.score(answer_key_map)
+        labels = [""] + store.group_labels
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["file", "student_number", "group", "correct", "wrong", "blank"])
+            for (file_name, number), g, c, w, b in zip(store.index, store.groups, correct, wrong, blank):
+                writer.writerow([file_name, number, labels[g], c, w, b])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import cv2
+import numpy as np
+
+import common_path  # noqa: F401
+from profiling import profiled
+
+# Hough parametreleri (yoğun grid için küçük minDist, hassas param2)
+HOUGH_PARAMS = dict(dp=1, minDist=10, param1=50, param2=20, minRadius=3, maxRadius=25)
+
+# Bir yuvarlağın satır/sütuna atanabilmesi için izin verilen uzaklık (aralığın oranı)
+ASSIGN_TOLERANCE = 0.4
+
+# Bu güvenin altındaki hücreler uyarı olarak raporlanır
+LOW_CONFIDENCE = 0.5
+
+
+@profiled("hough_circles")
+def detect_bubbles(gray, bbox):
+    # Bölge kutusundaki yuvarlakların merkezleri, (N, 2) dizi
+    x, y, w, h = bbox
+    blurred = cv2.GaussianBlur(gray[y:y + h, x:x + w], (5, 5), 0)
+    circles = cv2.HoughCircles(blurred, cv2.HOUGH_GRADIENT, **HOUGH_PARAMS)
+    if circles is None:
+        return np.zeros((0, 2))
+    return circles[0, :, :2].astype(np.float64) + (x, y)
+
+
+def _is_uniform(prior):
+    steps = np.diff(prior)
+    return len(prior) < 3 or np.allclose(steps, steps[0], atol=1e-3 * abs(steps[0]) + 1e-9)
+
+
+def fit_axis(values, prior, tolerance, iterations=10):
+    # Tek eksende merkezleri kümele: her değer en yakın konuma atanır (tolerans
+    # dışındakiler aykırı sayılır), konumlar atanan değerlerin medyanına taşınır.
+    # Eşit aralıklı eksende doğrusal kafes (a + b * i) oturtulur; boş kalan
+    # satır/sütunlar bu kafesten, düzensiz eksende ise ortalama kaymadan kestirilir.
+    prior = np.asarray(prior, dtype=np.float64)
+    uniform = _is_uniform(prior)
+    positions = prior.copy()
+    for _ in range(iterations):
+        if len(values):
+            distances = np.abs(values[:, None] - positions[None, :])
+            nearest = distances.argmin(axis=1)
+            nearest[distances.min(axis=1) > tolerance] = -1
+        else:
+            nearest = np.zeros(0, dtype=np.int64)
+
+        counts = np.bincount(nearest[nearest >= 0], minlength=len(positions))
+        observed = counts > 0
+        measured = np.array([np.median(values[nearest == i]) if counts[i] else np.nan
+                             for i in range(len(positions))])
+
+        if uniform and observed.sum() >= 2:
+            index = np.flatnonzero(observed)
+            slope, intercept = np.polyfit(index, measured[observed], 1, w=np.sqrt(counts[observed]))
+            updated = intercept + slope * np.arange(len(positions))
+        else:
+            offset = np.median(measured[observed] - prior[observed]) if observed.any() else 0.0
+            updated = np.where(observed, measured, prior + offset)
+
+        converged = np.abs(updated - positions).max() < 0.1
+        positions = updated
+        if converged:
+            break
+    return positions
+
+
+def fit_grid(gray, bbox, cols_at, rows_at):
+    # Bölgedeki Hough merkezlerine satır/sütun kafesi oturtur. Dönüş:
+    # (sütun x'leri, satır y'leri, hücre güveni (satır x sütun), istatistik).
+    # Güven, hücreye en yakın yuvarlağın uzaklığından hesaplanır; yuvarlağı
+    # bulunamayan (kafesten kestirilen) hücrelerin güveni 0'dır.
+    x, y, w, h = bbox
+    prior_x = x + np.asarray(cols_at, dtype=np.float64) * w
+    prior_y = y + np.asarray(rows_at, dtype=np.float64) * h
+    spacing_x = np.median(np.diff(prior_x)) if len(prior_x) > 1 else w
+    spacing_y = np.median(np.diff(prior_y)) if len(prior_y) > 1 else h
+    tol_x, tol_y = ASSIGN_TOLERANCE * spacing_x, ASSIGN_TOLERANCE * spacing_y
+
+    points = detect_bubbles(gray, bbox)
+    xs = fit_axis(points[:, 0], prior_x, tol_x)
+    ys = fit_axis(points[:, 1], prior_y, tol_y)
+
+    # Her yuvarlak en yakın hücreye atanır; bir hücreye düşen fazladan yuvarlaklar
+    # ve hiçbir satır/sütuna uymayanlar aykırı sayılır
+    confidence = np.zeros((len(ys), len(xs)))
+    inliers = 0
+    if len(points):
+        dx = np.abs(points[:, 0, None] - xs[None, :])
+        dy = np.abs(points[:, 1, None] - ys[None, :])
+        col, row = dx.argmin(axis=1), dy.argmin(axis=1)
+        ex = dx[np.arange(len(points)), col] / tol_x
+        ey = dy[np.arange(len(points)), row] / tol_y
+        error = np.hypot(ex, ey)
+        for i in np.argsort(error):
+            if ex[i] > 1 or ey[i] > 1 or confidence[row[i], col[i]] > 0:
+                continue
+            confidence[row[i], col[i]] = max(1.0 - error[i] / np.sqrt(2), 1e-3)
+            inliers += 1
+
+    stats = {
+        "detected": len(points),
+        "outliers": len(points) - inliers,
+        "missing": int((confidence == 0).sum()),
+    }
+    return xs, ys, confidence, stats
@@ -1,229 +1,36 @@
-import cv2
-import numpy as np
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import os
+import queue
+import threading
+import time
 from collections import defaultdict
 
-
-def find_colored_area(image, target_color):
-    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-    if target_color == (17, 255, 0):  # Yeşil (#11FF00)
-        lower = np.array([50, 100, 100])
-        upper = np.array([70, 255, 255])
-    elif target_color == (255, 221, 0):  # Sarı (#FFDD00)
-        lower = np.array([20, 100, 100])
-        upper = np.array([30, 255, 255])
-    elif target_color == (255, 0, 251):  # Pembe (#FF00FB)
-        lower = np.array([140, 100, 100])
-        upper = np.array([160, 255, 255])
-    elif target_color == (255, 0, 4):  # Kırmızı (#FF0004)
-        lower = np.array([0, 100, 100])
-        upper = np.array([10, 255, 255])
-    elif target_color == (0, 242, 255):  # Mavi (#00F2FF)
-        lower = np.array([80, 100, 100])
-        upper = np.array([100, 255, 255])
-    else:
-        raise ValueError("Geçersiz renk!")
-
-    mask = cv2.inRange(hsv, lower, upper)
-    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    if not contours:
-        raise ValueError(f"{target_color} renkli alan bulunamadı!")
-
-    contour = max(contours, key=cv2.contourArea)
-    x, y, w, h = cv2.boundingRect(contour)
-    return x, y, w, h
-
-
-def detect_circles(image, x, y, w, h, expected_count, orientation="vertical"):
-    roi = image[y:y + h, x:x + w]
-    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-
-    circles = cv2.HoughCircles(
-        blurred,
-        cv2.HOUGH_GRADIENT,
-        dp=1,
-        minDist=10,
-        param1=50,
-        param2=20,
-        minRadius=3,
-        maxRadius=25
-    )
-
-    if circles is None or len(circles[0]) < expected_count:
-        raise ValueError(
-            f"Yeterli yuvarlak tespit edilemedi! ({len(circles[0]) if circles is not None else 0}/{expected_count})")
-
-    circles = np.uint16(np.around(circles))
-    centers = [(circle[0] + x, circle[1] + y) for circle in circles[0, :]]
-
-    if expected_count > 4:
-        if expected_count == 80:
-            centers = sorted(centers, key=lambda c: c[0])
-            grid = []
-            for i in range(0, len(centers), 10):
-                column = centers[i:i + 10]
-                if len(column) != 10:
-                    print(f"Uyarı: Öğrenci numarası sütununda {len(column)} yuvarlak bulundu, beklenen: 10")
-                column = sorted(column, key=lambda c: c[1])
-                grid.append(column)
-            if len(grid) != 8:
-                raise ValueError(f"Öğrenci numarası gridi hatalı! {len(grid)} sütun bulundu, beklenen: 8")
-        else:
-            centers = sorted(centers, key=lambda c: c[1])
-            grid = []
-            for i in range(0, len(centers), 5):
-                row = centers[i:i + 5]
-                if len(row) != 5:
-                    print(f"Uyarı: Cevap satırında {len(row)} yuvarlak bulundu, beklenen: 5")
-                row = sorted(row, key=lambda c: c[0])
-                grid.append(row)
-            if len(grid) != 20:
-                raise ValueError(f"Cevap gridi hatalı! {len(grid)} satır bulundu, beklenen: 20")
-        return grid
-    else:
-        if orientation == "vertical":
-            centers = sorted(centers, key=lambda c: c[1])
-        else:
-            centers = sorted(centers, key=lambda c: c[0])
-        return centers[:expected_count]
-
-
-def read_marked_circles(image, centers, threshold=80, is_grid=False):
-    if is_grid:
-        result = ""
-        for row_idx, row in enumerate(centers):
-            marked_count = 0
-            marked_answer = None
-            for idx, (cx, cy) in enumerate(row):
-                roi = image[cy - 5:cy + 5, cx - 5:cx + 5]
-                if roi.size == 0:
-                    continue
-                gray_roi = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-                avg_intensity = np.mean(gray_roi)
-                if avg_intensity < threshold:
-                    marked_count += 1
-                    marked_answer = str(idx) if len(row) == 10 else chr(65 + idx)
-            if marked_count > 1:
-                result += "M"  # Multiple marks indicator
-                print(f"Soru {row_idx + 1}: Birden fazla işaretleme tespit edildi")
-            elif marked_count == 0:
-                result += "X"
-                print(f"Soru {row_idx + 1}: Boş")
-            else:
-                result += marked_answer
-                print(f"Soru {row_idx + 1}: {marked_answer}")
-        return result
-    else:
-        marked_count = 0
-        marked_idx = -1
-        for idx, (cx, cy) in enumerate(centers):
-            roi = image[cy - 5:cy + 5, cx - 5:cx + 5]
-            if roi.size == 0:
-                continue
-            gray_roi = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-            avg_intensity = np.mean(gray_roi)
-            if avg_intensity < threshold:
-                marked_count += 1
-                marked_idx = idx
-        if marked_count > 1:
-            return -2  # Multiple marks indicator for non-grid
-        return marked_idx
-
-
-def check_answers(answers, group, answer_key_map):
-    if group not in answer_key_map or not answer_key_map[group]:
-        return 0, 0, 20
-    answer_key = answer_key_map[group]
-    correct = 0
-    wrong = 0
-    blank = 0
-    for student_answer, correct_answer in zip(answers, answer_key):
-        if student_answer == "X":
-            blank += 1
-        elif student_answer == "M":
-            wrong += 1  # Multiple marks considered wrong
-        elif student_answer == correct_answer:
-            correct += 1
-        else:
-            wrong += 1
-    return correct, wrong, blank
-
-
-def process_optic_form(template_path, optic_path, answer_key_map):
-    template_img = cv2.imread(template_path)
-    optic_img = cv2.imread(optic_path)
-
-    if template_img is None or optic_img is None:
-        raise ValueError(f"Görüntü dosyaları yüklenemedi: {optic_path}")
-
-    # Process student number (Green area)
-    x, y, w, h = find_colored_area(template_img, (17, 255, 0))
-    student_grid = detect_circles(template_img, x, y, w, h, 80, "vertical")
-    student_number = read_marked_circles(optic_img, student_grid, is_grid=True)
-
-    # Process exam type (Yellow area)
-    x, y, w, h = find_colored_area(template_img, (255, 221, 0))
-    exam_type_circles = detect_circles(template_img, x, y, w, h, 4, "vertical")
-    exam_type_idx = read_marked_circles(optic_img, exam_type_circles)
-    exam_types = ["Ara Sınav", "Yarıyıl Sonu", "Bütünleme", "Diğer"]
-    exam_type = exam_types[exam_type_idx] if exam_type_idx >= 0 else "Bilinmiyor"
-
-    # Process group (Pink area)
-    x, y, w, h = find_colored_area(template_img, (255, 0, 251))
-    group_circles = detect_circles(template_img, x, y, w, h, 4, "horizontal")
-    group_idx = read_marked_circles(optic_img, group_circles)
-    groups = ["A", "B", "C", "D"]
-    group = groups[group_idx] if group_idx >= 0 else "Bilinmiyor"
-
-    # Process semester (Red area)
-    x, y, w, h = find_colored_area(template_img, (255, 0, 4))
-    semester_circles = detect_circles(template_img, x, y, w, h, 3, "horizontal")
-    semester_idx = read_marked_circles(optic_img, semester_circles)
-    semesters = ["Güz", "Bahar", "Yaz Okulu"]
-    semester = semesters[semester_idx] if semester_idx >= 0 else "Bilinmiyor"
-
-    # Process answers (Blue area)
-    x, y, w, h = find_colored_area(template_img, (0, 242, 255))
-    answer_grid = detect_circles(template_img, x, y, w, h, 100, "vertical")
-    answers = read_marked_circles(optic_img, answer_grid, is_grid=True)
-
-    # Check answers
-    correct, wrong, blank = check_answers(answers, group, answer_key_map)
-
-    return {
-        "student_number": student_number,
-        "exam_type": exam_type,
-        "group": group,
-        "semester": semester,
-        "answers": answers,
-        "correct": correct,
-        "wrong": wrong,
-        "blank": blank,
-        "file_name": os.path.basename(optic_path)
-    }
+from engine import ANSWERS_REGION, FIELD_TITLES, GROUP_REGION, grade_forms
+from layout import load_template_layout
+from sheetio import expand_source
 
 
 class AnswerKeyWindow(tk.Toplevel):
-    def __init__(self, parent, callback):
+    def __init__(self, parent, callback, question_count=20, choices=("A", "B", "C", "D", "E"),
+                 groups=("A", "B", "C", "D")):
         super().__init__(parent)
         self.title("Cevap Anahtarı Girişi")
         self.geometry("400x600")
         self.callback = callback
         self.answer_key = []
-        self.group = tk.StringVar(value="A")
+        self.group = tk.StringVar(value=groups[0])
+        self.choices = list(choices)
 
         tk.Label(self, text="Grup Seçimi:").pack(pady=5)
-        tk.OptionMenu(self, self.group, "A", "B", "C", "D").pack()
+        tk.OptionMenu(self, self.group, *groups).pack()
 
         self.entries = []
-        for i in range(20):
+        for i in range(question_count):
             frame = tk.Frame(self)
             frame.pack(pady=2)
             tk.Label(frame, text=f"Soru {i+1}:", width=10).pack(side=tk.LEFT)
-            entry = ttk.Combobox(frame, values=["A", "B", "C", "D", "E"], width=5)
+            entry = ttk.Combobox(frame, values=self.choices, width=5)
             entry.pack(side=tk.LEFT)
             self.entries.append(entry)
 
@@ -231,11 +38,22 @@ class AnswerKeyWindow(tk.Toplevel):
 
     def save(self):
         answers = [entry.get() for entry in self.entries]
-        if all(answer in ["A", "B", "C", "D", "E"] for answer in answers):
+        if all(answer in self.choices for answer in answers):
             self.callback(self.group.get(), answers)
             self.destroy()
         else:
-            messagebox.showerror("Hata", "Tüm sorular için geçerli bir cevap (A-E) seçiniz!")
+            messagebox.showerror("Hata", f"Tüm sorular için geçerli bir cevap ({'/'.join(self.choices)}) seçiniz!")
+
+
+# Sonuç kuyruğunun kontrol aralığı (ms) ve bir seferde ekrana yazılan en fazla sonuç
+POLL_INTERVAL_MS = 100
+MAX_RESULTS_PER_POLL = 200
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
 
 
 class OpticalFormScanner(tk.Tk):
@@ -268,6 +86,22 @@ class OpticalFormScanner(tk.Tk):
         # Scan button
         tk.Button(self, text="Tarama Yap", command=self.scan_forms, state=tk.DISABLED).pack(pady=5)
 
+        # İlerleme çubuğu, hız/kalan süre ve iptal
+        progress_frame = tk.Frame(self)
+        progress_frame.pack(pady=5)
+        self.progress = ttk.Progressbar(progress_frame, length=400, mode="determinate")
+        self.progress.pack(side=tk.LEFT)
+        self.cancel_button = tk.Button(progress_frame, text="İptal", command=self.cancel_scan, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+        self.progress_label = tk.Label(self, text="")
+        self.progress_label.pack()
+
+        # Arka plan taraması ile arayüz arasındaki durum
+        self.results = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.scan_thread = None
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
         # Results display
         self.result_text = tk.Text(self, height=20, width=60)
         self.result_text.pack(pady=5)
@@ -284,17 +118,32 @@ class OpticalFormScanner(tk.Tk):
             self.children["!button4"].config(state=tk.DISABLED)
 
     def select_optic_forms(self):
-        paths = filedialog.askopenfilenames(filetypes=[("PNG files", "*.png")])
+        paths = filedialog.askopenfilenames(filetypes=[("PNG files", "*.png"),
+                                                       ("Scanner batches", "*.tif *.tiff *.pdf")])
         if paths:
             self.optic_listbox.delete(0, tk.END)
-            self.optic_paths = list(paths)
+            # Çok sayfalı belgelerde her sayfa ayrı form olarak listelenir
+            self.optic_paths = [ref for path in paths for ref in expand_source(path)]
             for path in self.optic_paths:
                 self.optic_listbox.insert(tk.END, os.path.basename(path))
             if self.answer_key_map:
                 self.children["!button4"].config(state=tk.NORMAL)
 
     def add_answer_key(self):
-        AnswerKeyWindow(self, self.save_answer_key)
+        # Soru sayısı, seçenekler ve gruplar şablonun şemasından alınır; şablon
+        # seçilmediyse (veya şemada grup bölgesi yoksa) standart form
+        question_count, choices, groups = 20, ("A", "B", "C", "D", "E"), ("A", "B", "C", "D")
+        if self.template_path:
+            try:
+                layout = load_template_layout(self.template_path)
+                question_count = layout.item_count(ANSWERS_REGION)
+                choices = layout.labels(ANSWERS_REGION)
+                if GROUP_REGION in layout.regions:
+                    groups = layout.labels(GROUP_REGION)
+            except (ValueError, KeyError) as e:
+                messagebox.showerror("Hata", f"Şablon hatası: {e}")
+                return
+        AnswerKeyWindow(self, self.save_answer_key, question_count, choices, groups)
 
     def save_answer_key(self, group, answers):
         self.answer_key_map[group] = answers
@@ -310,28 +159,127 @@ class OpticalFormScanner(tk.Tk):
         if not self.template_path or not self.optic_paths:
             messagebox.showerror("Hata", "Template ve en az bir optik form seçilmelidir!")
             return
+        if self.scan_thread is not None:
+            return
 
         self.result_text.config(state=tk.NORMAL)
         self.result_text.delete(1.0, tk.END)
 
-        for optic_path in self.optic_paths:
+        # Şablon tüm formlar için bir kez analiz edilir
+        try:
+            layout = load_template_layout(self.template_path)
+        except Exception as e:
+            self.result_text.insert(tk.END, f"Şablon hatası: {str(e)}\n")
+            self.result_text.config(state=tk.DISABLED)
+            return
+        self.result_text.config(state=tk.DISABLED)
+
+        # Tarama arka plan iş parçacığında çalışır; Tk döngüsü donmaz. Sonuçlar
+        # kuyruktan after() ile toplu olarak alınır.
+        self.layout = layout
+        self.total = len(self.optic_paths)
+        self.done_count = 0
+        self.started_at = time.perf_counter()
+        self.cancel_event.clear()
+        self.progress.config(maximum=self.total, value=0)
+        self.progress_label.config(text=f"0/{self.total}")
+        self.children["!button4"].config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+
+        self.scan_thread = threading.Thread(
+            target=self._scan_worker,
+            args=(self.template_path, list(self.optic_paths), dict(self.answer_key_map), layout),
+            daemon=True)
+        self.scan_thread.start()
+        self.after(POLL_INTERVAL_MS, self._poll_results)
+
+    def cancel_scan(self):
+        # Bekleyen formlar havuza gönderilmez; işlenmekte olanların sonucu beklenmez
+        self.cancel_event.set()
+        self.cancel_button.config(state=tk.DISABLED)
+        self.progress_label.config(text=f"{self.done_count}/{self.total} — iptal ediliyor...")
+
+    def on_close(self):
+        # Pencere kapanırken süren tarama da durdurulur
+        self.cancel_event.set()
+        self.destroy()
+
+    def _scan_worker(self, template_path, optic_paths, answer_key_map, layout):
+        # Arka plan iş parçacığı: Tk nesnelerine dokunmaz, yalnızca kuyruğa yazar
+        results = grade_forms(template_path, optic_paths, answer_key_map, layout=layout,
+                              cancel_event=self.cancel_event)
+        try:
+            for item in results:
+                self.results.put(("result", item))
+                if self.cancel_event.is_set():
+                    break
+        except Exception as e:
+            self.results.put(("fatal", str(e)))
+        finally:
+            # Üreticiyi kapatmak başlamamış işleri iptal eder
+            results.close()
+            self.results.put(("done", self.cancel_event.is_set()))
+
+    def _format_result(self, optic_path, result, error):
+        lines = []
+        if error is None:
+            lines.append(f"\nDosya: {result['file_name']}")
+            for name in self.layout.regions:
+                lines.append(f"{FIELD_TITLES.get(name, name)}: {result[name]}")
+            lines.append(f"Doğru: {result['correct']}, Yanlış: {result['wrong']}, Boş: {result['blank']}")
+            if result["review"]:
+                lines.append(f"İnceleme gerekli: {', '.join(result['review'])}")
+        else:
+            lines.append(f"\nDosya: {os.path.basename(optic_path)}")
+            lines.append(f"Hata: {error}")
+        lines.append("-" * 50)
+        return "\n".join(lines) + "\n"
+
+    def _poll_results(self):
+        # Kuyruktaki sonuçları tek bir insert ile yaz; her form için ayrı yeniden
+        # çizim büyük partilerde arayüzü yavaşlatır
+        chunks = []
+        finished = None
+        for _ in range(MAX_RESULTS_PER_POLL):
             try:
-                result = process_optic_form(self.template_path, optic_path, self.answer_key_map)
-                self.result_text.insert(tk.END, f"\nDosya: {result['file_name']}\n")
-                self.result_text.insert(tk.END, f"Öğrenci Numarası: {result['student_number']}\n")
-                self.result_text.insert(tk.END, f"Sınav Türü: {result['exam_type']}\n")
-                self.result_text.insert(tk.END, f"Grup: {result['group']}\n")
-                self.result_text.insert(tk.END, f"Dönem: {result['semester']}\n")
-                self.result_text.insert(tk.END, f"Cevaplar: {result['answers']}\n")
-                self.result_text.insert(tk.END,
-                                        f"Doğru: {result['correct']}, Yanlış: {result['wrong']}, Boş: {result['blank']}\n")
-                self.result_text.insert(tk.END, "-" * 50 + "\n")
-            except Exception as e:
-                self.result_text.insert(tk.END, f"\nDosya: {os.path.basename(optic_path)}\n")
-                self.result_text.insert(tk.END, f"Hata: {str(e)}\n")
-                self.result_text.insert(tk.END, "-" * 50 + "\n")
+                kind, payload = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "result":
+                chunks.append(self._format_result(*payload))
+                self.done_count += 1
+            elif kind == "fatal":
+                chunks.append(f"\nHata: {payload}\n")
+            else:
+                finished = payload
 
-        self.result_text.config(state=tk.DISABLED)
+        if chunks:
+            self.result_text.config(state=tk.NORMAL)
+            self.result_text.insert(tk.END, "".join(chunks))
+            self.result_text.see(tk.END)
+            self.result_text.config(state=tk.DISABLED)
+        self._update_progress(finished)
+
+        if finished is None:
+            self.after(POLL_INTERVAL_MS, self._poll_results)
+        else:
+            self.scan_thread = None
+            self.cancel_button.config(state=tk.DISABLED)
+            self.children["!button4"].config(state=tk.NORMAL)
+
+    def _update_progress(self, finished):
+        elapsed = time.perf_counter() - self.started_at
+        rate = self.done_count / elapsed if elapsed > 0 else 0.0
+        self.progress.config(value=self.done_count)
+        text = f"{self.done_count}/{self.total} — {rate:.1f} form/sn"
+        if finished is None:
+            if rate > 0:
+                text += f", kalan ~{format_duration((self.total - self.done_count) / rate)}"
+        elif finished:
+            text += f" — iptal edildi ({format_duration(elapsed)})"
+        else:
+            text += f" — tamamlandı ({format_duration(elapsed)})"
+        self.progress_label.config(text=text)
 
 
 if __name__ == "__main__":
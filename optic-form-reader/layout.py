@@ -0,0 +1,361 @@
+import hashlib
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+
+import common_path  # noqa: F401
+from gridfit import LOW_CONFIDENCE, fit_grid
+from profiling import profiled
+from schema import cell_items, lattice_items, load_schema, region_centers, schema_path_for
+
+# Şablon düzeni değiştiğinde (bölge tanımı, sıralama mantığı vb.) artırılır;
+# eski önbellek dosyaları bu sayede kendiliğinden geçersiz olur.
+LAYOUT_VERSION = 4
+
+# Aynı süreç içinde şablonu tekrar derlememek için bellek içi önbellek (özet -> düzen)
+_LAYOUT_CACHE = {}
+
+# Şablon ve şema dosyalarının (yol, değişiklik zamanı, boyut) bilgisi -> özet; dosyalar
+# değişmedikçe her çağrıda yeniden okunup özetlenmez
+_LAYOUT_FILES = {}
+
+
+def find_colored_contour(image, hsv_range, hsv=None):
+    # Verilen HSV aralığındaki renkli alanın en büyük konturunu bul
+    if hsv is None:
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    lower, upper = hsv_range
+
+    mask = cv2.inRange(hsv, np.array(lower), np.array(upper))
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        raise ValueError(f"{tuple(lower)}-{tuple(upper)} HSV aralığında renkli alan bulunamadı!")
+    return max(contours, key=cv2.contourArea)
+
+
+def color_luts(hsv_ranges):
+    # Her HSV kanalı için 256 girişlik bit maskesi tablosu: i. bit, değerin i. renk
+    # aralığına düştüğünü gösterir. Bir pikselin etiketi üç tablonun AND'idir.
+    count = len(hsv_ranges)
+    dtype = np.uint8 if count <= 8 else np.uint16 if count <= 16 else np.uint32 if count <= 32 else np.uint64
+    luts = np.zeros((3, 256), dtype=dtype)
+    for i, (lower, upper) in enumerate(hsv_ranges):
+        for channel in range(3):
+            luts[channel, lower[channel]:upper[channel] + 1] |= dtype(1 << i)
+    return luts
+
+
+def classify_colors(hsv, luts):
+    # Tüm renk aralıklarını tek geçişte sınıflandır; sonuç piksel başına bit maskesi
+    h, s, v = cv2.split(hsv)
+    if luts.dtype == np.uint8:
+        bits = cv2.LUT(h, luts[0])
+        cv2.bitwise_and(bits, cv2.LUT(s, luts[1]), dst=bits)
+        cv2.bitwise_and(bits, cv2.LUT(v, luts[2]), dst=bits)
+        return bits
+    return luts[0][h] & luts[1][s] & luts[2][v]
+
+
+def _lowest_bit(bits):
+    # Bit maskesini etikete çevir: 0 renksiz, i + 1 en düşük numaralı aralık
+    if bits.dtype == np.uint8:
+        return cv2.LUT(bits, _LOWEST_BIT_LUT)
+    labels = np.zeros(bits.shape, dtype=np.int32)
+    for i in reversed(range(bits.dtype.itemsize * 8)):
+        labels[(bits >> np.uint64(i) & 1).astype(bool)] = i + 1
+    return labels
+
+
+_LOWEST_BIT_LUT = np.array([0] + [(v & -v).bit_length() for v in range(1, 256)], dtype=np.uint8)
+
+
+@profiled()
+def locate_regions(image, hsv_ranges, hsv=None):
+    # Tüm renkli bölgeleri birlikte bulur: tek HSV dönüşümü, tablo ile tek geçişte
+    # sınıflandırma ve renkli piksellerin tümü üzerinde tek kontur araması. Her
+    # aralık için en büyük kontur (aralıklarla aynı sırada) döner. Bölge sayısı
+    # arttıkça tam görüntü geçişi artmaz.
+    if hsv is None:
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    labels = _lowest_bit(classify_colors(hsv, color_luts(hsv_ranges))).astype(np.uint8)
+
+    # Farklı renkteki bölgeler birbirine değiyorsa tek kontur olmasınlar diye, daha
+    # yüksek etiketli bir komşusu olan pikseller silinir. Böylece her kontur tek
+    # renkten oluşur; dış kenarlar (renksiz komşu) etkilenmez.
+    mask = labels.copy()
+    mask[cv2.dilate(labels, np.ones((3, 3), np.uint8)) > labels] = 0
+
+    # RETR_LIST: başka bir renkli bölgenin içinde kalan bölgeler de kaybolmasın
+    found, _ = cv2.findContours(mask, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    contours = [None] * len(hsv_ranges)
+    remaining = len(hsv_ranges)
+    for contour in sorted(found, key=cv2.contourArea, reverse=True):
+        # Kontur noktaları bölgenin kendi pikselleridir
+        x, y = contour[0, 0]
+        label = int(mask[y, x]) - 1
+        if label >= 0 and contours[label] is None:
+            contours[label] = contour
+            remaining -= 1
+            if remaining == 0:
+                break
+
+    for contour, (lower, upper) in zip(contours, hsv_ranges):
+        if contour is None:
+            raise ValueError(f"{tuple(lower)}-{tuple(upper)} HSV aralığında renkli alan bulunamadı!")
+    return contours
+
+
+@profiled()
+def find_colored_area(image, hsv_range):
+    # Belirtilen renkli alanın sınırlayıcı kutusu
+    x, y, w, h = cv2.boundingRect(find_colored_contour(image, hsv_range))
+    return x, y, w, h
+
+
+def contour_corners(contour):
+    # Dikdörtgen bölgenin dört köşesi (sol üst, sağ üst, sağ alt, sol alt sırasıyla).
+    # Perspektifle bozulmuş bölge artık dikdörtgen olmadığından önce dörtgen
+    # yaklaşımı denenir; olmazsa en küçük döndürülmüş dikdörtgene düşülür.
+    approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+    if len(approx) == 4:
+        pts = approx.reshape(4, 2).astype("float32")
+    else:
+        pts = cv2.boxPoints(cv2.minAreaRect(contour))
+    rect = np.zeros((4, 2), dtype="float32")
+    s = pts.sum(axis=1)
+    rect[0] = pts[np.argmin(s)]
+    rect[2] = pts[np.argmax(s)]
+    diff = np.diff(pts, axis=1)
+    rect[1] = pts[np.argmin(diff)]
+    rect[3] = pts[np.argmax(diff)]
+    return rect
+
+
+class TemplateLayout:
+    # Şablon ve şemadan bir kez çıkarılan bölge kutuları ve yuvarlak merkezleri.
+    # Metin bölgelerinde merkezler madde listeleri, seçim bölgelerinde düz liste.
+    # Bölgeler şemadaki sırayı korur.
+
+    def __init__(self, template_hash, regions, size=None):
+        self.template_hash = template_hash  # Şablon + şema içeriğinin özeti
+        self.regions = regions
+        self.size = size  # Şablonun (genişlik, yükseklik) değeri
+        self._index = None
+        self._windows = {}
+
+    def bbox(self, name):
+        return self.regions[name]["bbox"]
+
+    def centers(self, name):
+        return self.regions[name]["centers"]
+
+    def is_grid(self, name):
+        return self.regions[name]["kind"] == "text"
+
+    def confidence(self, name):
+        # Kafes oturtulan bölgelerde yuvarlak başına güven (merkezlerle aynı yapıda),
+        # konumları doğrudan şemadan gelen bölgelerde None
+        return self.regions[name].get("confidence")
+
+    def kind(self, name):
+        return self.regions[name]["kind"]
+
+    def labels(self, name):
+        return self.regions[name]["labels"]
+
+    def item_count(self, name):
+        # Bölgedeki madde sayısı (ör. soru sayısı); seçim bölgeleri tek maddedir
+        return len(self.centers(name)) if self.is_grid(name) else 1
+
+    def hsv_range(self, name):
+        return self.regions[name]["hsv"]
+
+    def sample_index(self):
+        # Tüm bölgelerin yuvarlak merkezleri tek bir (N, 2) dizide ve her bölgenin
+        # bu dizideki yeri: ad -> (başlangıç, madde uzunlukları). Bir kez kurulur.
+        if self._index is None:
+            points = []
+            spans = {}
+            for name in self.regions:
+                lines = self.centers(name) if self.is_grid(name) else [self.centers(name)]
+                spans[name] = (len(points), [len(line) for line in lines])
+                points.extend(c for line in lines for c in line)
+            self._index = (np.array(points, dtype=np.int64).reshape(-1, 2), spans)
+        return self._index
+
+    def windows(self, margin):
+        # Bölge başına örnekleme penceresi (x0, y0, x1, y1): bölgenin yuvarlak
+        # merkezlerini margin payıyla kapsayan, şablon sınırına kırpılmış kutu.
+        # Okuma yalnızca bu pencerelerdeki pikselleri kullanır.
+        if margin not in self._windows:
+            points, spans = self.sample_index()
+            width, height = self.size
+            windows = {}
+            for name, (start, lengths) in spans.items():
+                region = points[start:start + sum(lengths)]
+                x0, y0 = np.maximum(region.min(axis=0) - margin, 0)
+                x1, y1 = region.max(axis=0) + margin + 1
+                windows[name] = (int(x0), int(y0), int(min(x1, width)), int(min(y1, height)))
+            self._windows[margin] = windows
+        return self._windows[margin]
+
+    def quad(self, name):
+        # Renkli bölgenin şablondaki dört köşesi; hizalamada referans noktası olarak kullanılır
+        return self.regions[name]["quad"]
+
+    def to_dict(self):
+        return {
+            "version": LAYOUT_VERSION,
+            "template_hash": self.template_hash,
+            "size": self.size,
+            "regions": self.regions,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        regions = {}
+        for name, region in data["regions"].items():
+            if region["kind"] == "text":
+                centers = [[tuple(c) for c in line] for line in region["centers"]]
+            else:
+                centers = [tuple(c) for c in region["centers"]]
+            regions[name] = {
+                "bbox": tuple(region["bbox"]),
+                "centers": centers,
+                "kind": region["kind"],
+                "labels": list(region["labels"]),
+                "hsv": tuple(tuple(v) for v in region["hsv"]),
+                "quad": [tuple(p) for p in region["quad"]],
+                "confidence": region.get("confidence"),
+            }
+        return cls(data["template_hash"], regions, tuple(data["size"]))
+
+
+def template_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+@profiled()
+def compile_template(template_img, digest=None, schema=None):
+    # Şemadaki her renkli bölgeyi şablonda bul; yuvarlak merkezleri bölge kutusu ve
+    # şemadaki grid tanımından hesaplanır. "fit" işaretli bölgelerde şablondaki
+    # yuvarlaklara kafes oturtulur (eksik yuvarlaklar kestirilir, aykırılar atılır).
+    if schema is None:
+        schema, _ = load_schema()
+    regions = {}
+    gray = None
+    contours = locate_regions(template_img, [region["hsv"] for region in schema])
+    for region, contour in zip(schema, contours):
+        bbox = cv2.boundingRect(contour)
+        confidence = None
+        if region["fit"]:
+            if gray is None:
+                gray = cv2.cvtColor(template_img, cv2.COLOR_BGR2GRAY)
+            xs, ys, cells, stats = fit_grid(gray, bbox, region["cols_at"], region["rows_at"])
+            centers = lattice_items(region, xs, ys)
+            confidence = cell_items(region, np.round(cells, 3).tolist())
+            _report_fit(region["name"], cells, stats)
+        else:
+            centers = region_centers(region, bbox)
+        if region["kind"] != "text":
+            centers = centers[0]
+            confidence = None if confidence is None else confidence[0]
+        regions[region["name"]] = {
+            "bbox": bbox,
+            "centers": centers,
+            "kind": region["kind"],
+            "labels": region["labels"],
+            "hsv": region["hsv"],
+            "quad": [tuple(float(v) for v in p) for p in contour_corners(contour)],
+            "confidence": confidence,
+        }
+    height, width = template_img.shape[:2]
+    return TemplateLayout(digest, regions, (width, height))
+
+
+def _report_fit(name, cells, stats):
+    # Şablon derlenirken kestirilen veya şüpheli hücreleri bildir
+    if stats["missing"]:
+        print(f"Uyarı: {name} bölgesinde {stats['missing']} yuvarlak bulunamadı, konumları kafesten kestirildi",
+              file=sys.stderr)
+    if stats["outliers"]:
+        print(f"Uyarı: {name} bölgesinde {stats['outliers']} aykırı yuvarlak yok sayıldı", file=sys.stderr)
+    weak = int(((cells > 0) & (cells < LOW_CONFIDENCE)).sum())
+    if weak:
+        print(f"Uyarı: {name} bölgesinde {weak} yuvarlağın güveni düşük (< {LOW_CONFIDENCE})", file=sys.stderr)
+
+
+def default_cache_path(template_path):
+    return template_path + ".layout.json"
+
+
+def _read_cached_layout(cache_path, digest):
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != LAYOUT_VERSION or data.get("template_hash") != digest:
+        return None
+    return TemplateLayout.from_dict(data)
+
+
+def _write_cached_layout(cache_path, layout):
+    # Yarım kalmış dosya bırakmamak için önce geçici dosyaya yaz
+    tmp_path = cache_path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(layout.to_dict(), f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Uyarı: Şablon önbelleği yazılamadı ({cache_path}): {e}", file=sys.stderr)
+
+
+@profiled()
+def load_template_layout(template_path, cache_path=None, use_cache=True, schema_path=None):
+    # Şablon ve şema içeriğinin özetine göre önbellekten yükle, yoksa derleyip kaydet.
+    # Şema verilmezse şablonun yanındaki "<ad>.schema.json", o da yoksa standart form.
+    schema_path = schema_path or schema_path_for(template_path)
+    files_key = _file_stamp(template_path) + _file_stamp(schema_path)
+    if files_key in _LAYOUT_FILES and use_cache:
+        return _LAYOUT_CACHE[_LAYOUT_FILES[files_key]]
+
+    try:
+        with open(template_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        raise ValueError(f"Şablon dosyası yüklenemedi: {template_path}")
+    schema, schema_data = load_schema(schema_path)
+
+    digest = template_hash(data + b"\0" + schema_data)
+    if digest in _LAYOUT_CACHE:
+        _LAYOUT_FILES[files_key] = digest
+        return _LAYOUT_CACHE[digest]
+
+    if cache_path is None:
+        cache_path = default_cache_path(template_path)
+
+    layout = _read_cached_layout(cache_path, digest) if use_cache else None
+    if layout is None:
+        template_img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if template_img is None:
+            raise ValueError(f"Şablon dosyası yüklenemedi: {template_path}")
+        layout = compile_template(template_img, digest, schema)
+        if use_cache:
+            _write_cached_layout(cache_path, layout)
+
+    _LAYOUT_CACHE[digest] = layout
+    _LAYOUT_FILES[files_key] = digest
+    return layout
+
+
+def _file_stamp(path):
+    # Dosya okunamıyorsa damga yok sayılır; hata asıl okuma sırasında raporlanır
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return (os.path.abspath(path), None, None)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
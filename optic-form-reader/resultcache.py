@@ -0,0 +1,85 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+# Önbellekte tutulan en fazla kayıt; aşılınca en uzun süredir kullanılmayanlar silinir
+DEFAULT_MAX_ENTRIES = 100000
+
+
+class ResultCache:
+    # SQLite'ta kalıcı okuma önbelleği. Anahtar, form görüntüsünün içerik özeti ile
+    # okumayı etkileyen sürümlerin (derlenmiş şablon + şema, okuma mantığı, hizalama)
+    # birleşimidir; değer ham okumadır (numara, cevaplar, güven...). Puanlama
+    # önbelleğe girmez: cevap anahtarı değişince kayıtlar yalnızca yeniden puanlanır.
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS results ("
+                          "key TEXT PRIMARY KEY, data TEXT NOT NULL, last_used REAL NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self.conn.commit()
+        self.count = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        # Sınır küçültülerek açıldıysa fazlalık hemen silinir
+        self._evict()
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(data, *versions):
+        digest = hashlib.sha256(data)
+        for version in versions:
+            digest.update(b"|" + str(version).encode("utf-8"))
+        return digest.hexdigest()
+
+    def key_for_file(self, path, *versions):
+        # Dosya okunamazsa None; hata asıl okuma sırasında raporlanır
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        return self.make_key(data, *versions)
+
+    def get(self, key):
+        row = self.conn.execute("SELECT data FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        self.conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        data = json.dumps(value, ensure_ascii=False)
+        cursor = self.conn.execute("INSERT OR IGNORE INTO results (key, data, last_used) VALUES (?, ?, ?)",
+                                   (key, data, time.time()))
+        if cursor.rowcount:
+            self.count += 1
+        else:
+            self.conn.execute("UPDATE results SET data = ?, last_used = ? WHERE key = ?", (data, time.time(), key))
+        self._evict()
+        self.conn.commit()
+
+    def _evict(self):
+        # En uzun süredir kullanılmayan kayıtları sınır aşılmayacak kadar sil
+        if self.count > self.max_entries:
+            self.conn.execute("DELETE FROM results WHERE key IN "
+                              "(SELECT key FROM results ORDER BY last_used LIMIT ?)",
+                              (self.count - self.max_entries,))
+            self.count = self.max_entries
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,129 @@
+import json
+import os
+
+# Form düzeni şeması: bölgeler, renkleri (HSV aralığı), grid boyutları, okuma yönü ve
+# etiketler JSON dosyasında tanımlanır. Yeni bir form (ör. 50/100 soru, daha uzun
+# öğrenci numarası) için kod değil yalnızca şema değişir.
+SCHEMA_VERSION = 1
+
+# Şablonun yanında "<ad>.schema.json" yoksa kullanılan standart form şeması
+DEFAULT_SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "form_schema.json")
+
+# "rows": her satır bir madde (seçenekler sütunlarda), "columns": her sütun bir madde
+READ_DIRECTIONS = ("rows", "columns")
+
+# "text": maddelerin etiketleri yan yana yazılır (boş "X", çoklu işaret "M"),
+# "choice": bölge tek bir maddedir, işaretli seçeneğin etiketi döner
+KINDS = ("text", "choice")
+
+
+def schema_path_for(template_path):
+    # TEMPLATE.png için önce TEMPLATE.schema.json aranır
+    path = os.path.splitext(template_path)[0] + ".schema.json"
+    return path if os.path.exists(path) else DEFAULT_SCHEMA_PATH
+
+
+def _positions(spec, count, name, axis):
+    # Bölge kutusuna göre (0-1) yuvarlak merkezleri. Verilmezse hücre ortaları,
+    # {"first": a, "last": b} ise eşit aralıklı, liste ise doğrudan konumlar.
+    if spec is None:
+        return [(i + 0.5) / count for i in range(count)]
+    if isinstance(spec, dict):
+        first, last = float(spec["first"]), float(spec["last"])
+        if count == 1:
+            return [first]
+        return [first + (last - first) * i / (count - 1) for i in range(count)]
+    if len(spec) != count:
+        raise ValueError(f"Şema hatası: {name} bölgesinde {axis} konum sayısı {len(spec)}, beklenen: {count}")
+    return [float(v) for v in spec]
+
+
+def _validate_region(region):
+    name = region.get("name")
+    if not name:
+        raise ValueError("Şema hatası: bölge adı eksik!")
+    for key in ("hsv", "rows", "cols", "read", "kind", "labels"):
+        if key not in region:
+            raise ValueError(f"Şema hatası: {name} bölgesinde '{key}' alanı eksik!")
+
+    rows, cols = int(region["rows"]), int(region["cols"])
+    if rows < 1 or cols < 1:
+        raise ValueError(f"Şema hatası: {name} bölgesinin boyutu geçersiz ({rows}x{cols})!")
+    if region["read"] not in READ_DIRECTIONS:
+        raise ValueError(f"Şema hatası: {name} bölgesinde geçersiz okuma yönü: {region['read']}")
+    if region["kind"] not in KINDS:
+        raise ValueError(f"Şema hatası: {name} bölgesinde geçersiz tür: {region['kind']}")
+
+    items, choices = (rows, cols) if region["read"] == "rows" else (cols, rows)
+    if region["kind"] == "choice" and items != 1:
+        raise ValueError(f"Şema hatası: {name} seçim bölgesi tek madde olmalı, {items} madde var!")
+    labels = list(region["labels"])
+    if len(labels) != choices:
+        raise ValueError(f"Şema hatası: {name} bölgesinde {len(labels)} etiket var, beklenen: {choices}")
+
+    lower, upper = region["hsv"]
+    return {
+        "name": name,
+        "hsv": (tuple(int(v) for v in lower), tuple(int(v) for v in upper)),
+        "rows": rows,
+        "cols": cols,
+        "read": region["read"],
+        "kind": region["kind"],
+        "labels": labels,
+        "cols_at": _positions(region.get("cols_at"), cols, name, "sütun"),
+        "rows_at": _positions(region.get("rows_at"), rows, name, "satır"),
+        # true ise konumlar şablondaki yuvarlaklara kafes oturtularak iyileştirilir
+        "fit": bool(region.get("fit", False)),
+    }
+
+
+def parse_schema(data):
+    if data.get("version") != SCHEMA_VERSION:
+        raise ValueError(f"Desteklenmeyen şema sürümü: {data.get('version')}")
+    regions = [_validate_region(region) for region in data.get("regions", [])]
+    if not regions:
+        raise ValueError("Şema hatası: hiç bölge tanımlanmamış!")
+    names = [region["name"] for region in regions]
+    if len(set(names)) != len(names):
+        raise ValueError("Şema hatası: bölge adları tekrar ediyor!")
+    return regions
+
+
+def load_schema(path=None):
+    # (bölge listesi, ham dosya içeriği) döner; ham içerik önbellek anahtarına girer
+    path = path or DEFAULT_SCHEMA_PATH
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except OSError:
+        raise ValueError(f"Şema dosyası yüklenemedi: {path}")
+    try:
+        data = json.loads(raw.decode("utf-8"))
+    except ValueError as e:
+        raise ValueError(f"Şema dosyası okunamadı ({path}): {e}")
+    return parse_schema(data), raw
+
+
+def region_centers(region, bbox):
+    # Bölge kutusu ve şemadaki grid tanımından yuvarlak merkezlerini hesaplar.
+    # Sonuç madde listesidir; her madde seçeneklerin (x, y) merkezlerini sırayla içerir.
+    x, y, w, h = bbox
+    xs = [x + fx * w for fx in region["cols_at"]]
+    ys = [y + fy * h for fy in region["rows_at"]]
+    return lattice_items(region, xs, ys)
+
+
+def lattice_items(region, xs, ys):
+    # Sütun x'leri ve satır y'lerinden okuma yönüne göre madde listesi
+    xs = [int(round(v)) for v in xs]
+    ys = [int(round(v)) for v in ys]
+    if region["read"] == "rows":
+        return [[(cx, cy) for cx in xs] for cy in ys]
+    return [[(cx, cy) for cy in ys] for cx in xs]
+
+
+def cell_items(region, cells):
+    # (satır x sütun) hücre değerlerini okuma yönüne göre madde listesine çevir
+    if region["read"] == "rows":
+        return [list(line) for line in cells]
+    return [list(line) for line in zip(*cells)]
@@ -0,0 +1,235 @@
+import cv2
+import numpy as np
+
+import common_path  # noqa: F401
+from profiling import profiled
+
+# Yuvarlak merkezinin etrafında örneklenen karenin yarı boyu (10x10 piksel)
+PATCH_HALF = 5
+
+# Formda iki ayrı parlaklık kümesi (işaretli/boş) bulunamazsa kullanılan sabit eşik
+FIXED_THRESHOLD = 80
+
+# İşaretli ve boş kümelerin ortancaları arasında en az bu kadar fark (gri seviye)
+# yoksa form tek kümeli (ör. hiç işaretlenmemiş) sayılır
+MIN_CONTRAST = 60
+
+# Bu güvenin altındaki maddeler insan incelemesine gönderilir
+REVIEW_CONFIDENCE = 0.5
+
+
+def to_gray(image):
+    # Form görüntüsünü bir kez griye çevir; zaten griyse olduğu gibi döndür
+    if image.ndim == 2:
+        return image
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def flatten_centers(centers, is_grid=False):
+    # Grid (satır listeleri) veya düz merkez listesini (N, 2) diziye çevir
+    if is_grid:
+        lengths = [len(line) for line in centers]
+        flat = [c for line in centers for c in line]
+    else:
+        lengths = [len(centers)]
+        flat = list(centers)
+    return np.array(flat, dtype=np.int64).reshape(-1, 2), lengths
+
+
+@profiled()
+def bubble_intensities(gray, points, half=PATCH_HALF):
+    # Tüm yuvarlakların ortalama parlaklığını integral görüntü ile tek seferde hesapla.
+    # Kenara taşan kareler görüntü sınırına kırpılır; boş kalanlar NaN döner.
+    height, width = gray.shape[:2]
+    integral = cv2.integral(gray, sdepth=cv2.CV_64F)
+
+    cx = points[:, 0]
+    cy = points[:, 1]
+    x0 = np.clip(cx - half, 0, width)
+    x1 = np.clip(cx + half, 0, width)
+    y0 = np.clip(cy - half, 0, height)
+    y1 = np.clip(cy + half, 0, height)
+
+    sums = integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+    areas = (x1 - x0) * (y1 - y0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(areas > 0, sums / np.maximum(areas, 1), np.nan)
+
+
+def fill_ratios(intensities):
+    # Parlaklığı doluluk oranına çevir: 0 boş (beyaz), 1 tamamen dolu (siyah)
+    return 1.0 - intensities / 255.0
+
+
+def sample_windows(layout):
+    # Okunan bölge pencereleri: yuvarlak merkezleri + örnekleme karesi payı
+    return layout.windows(PATCH_HALF)
+
+
+def region_tiles(image, layout):
+    # Şablona hizalı görüntüden bölge pencerelerini keser (kopyalamadan): ad -> (karo, (x0, y0))
+    return {name: (image[y0:y1, x0:x1], (x0, y0)) for name, (x0, y0, x1, y1) in sample_windows(layout).items()}
+
+
+@profiled()
+def read_tiles(tiles, layout, names=None):
+    # Bölge karolarındaki yuvarlakların ortalama parlaklıkları. Griye çevirme ve integral
+    # görüntü yalnızca karolar üzerinde yapılır. Örnekleme noktaları düzen derlenirken
+    # bir kez dizilir (layout.sample_index).
+    # Sonuç: bölge adı -> madde listesi (metin bölgesi) veya dizi (seçim bölgesi)
+    points, spans = layout.sample_index()
+    result = {}
+    for name in (layout.regions if names is None else names):
+        start, lengths = spans[name]
+        tile, origin = tiles[name]
+        count = sum(lengths)
+        if tile.size:
+            region = bubble_intensities(to_gray(tile), points[start:start + count] - np.array(origin))
+        else:
+            region = np.full(count, np.nan)
+        if layout.is_grid(name):
+            result[name] = np.split(region, np.cumsum(lengths)[:-1])
+        else:
+            result[name] = region
+    return result
+
+
+def read_regions(image, layout, names=None):
+    # Şablona hizalı tam görüntüden tüm bölgeleri okur
+    return read_tiles(region_tiles(image, layout), layout, names)
+
+
+def sheet_levels(values, fallback=FIXED_THRESHOLD):
+    # Formdaki tüm yuvarlakların parlaklığından (eşik, boş seviyesi, kontrast) çıkarır.
+    # Otsu dağılımı işaretli/boş diye ikiye ayırır; eşik iki kümenin ortancalarının
+    # ortasıdır. Hafif kurşun kalem veya koyu/açık tarama eşiği kendiliğinden kaydırır.
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return float(fallback), 255.0, 2 * (255.0 - fallback)
+    data = np.clip(np.round(values), 0, 255).astype(np.uint8).reshape(1, -1)
+    split, _ = cv2.threshold(data, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    dark, light = values[values <= split], values[values > split]
+    if len(dark) and len(light) and np.median(light) - np.median(dark) >= MIN_CONTRAST:
+        marked, blank = float(np.median(dark)), float(np.median(light))
+        return (marked + blank) / 2, blank, blank - marked
+
+    # Tek küme: sabit eşik, kontrast boş seviyesinden kestirilir
+    above = values[values >= fallback]
+    blank = float(np.median(above)) if len(above) else float(np.median(values))
+    return float(fallback), blank, max(2 * (blank - fallback), MIN_CONTRAST)
+
+
+def item_levels(row, threshold, blank, contrast):
+    # Madde (satır) eşiği: satırın ortancası boş bir yuvarlaksa, satırın boş
+    # seviyesinin formunkinden farkı kadar kaydırılır (tarayıcı ışık kayması).
+    # Güven: yuvarlakların eşiğe en yakın olanının uzaklığı / (kontrast / 2).
+    valid = row[~np.isnan(row)]
+    limit = threshold
+    if len(valid) >= 3:
+        median = float(np.median(valid))
+        if median > threshold:
+            limit += float(np.clip(median - blank, -contrast / 4, contrast / 4))
+    margins = np.abs(row - limit) / (contrast / 2)
+    confidence = float(np.nan_to_num(margins, nan=0.0).clip(0, 1).min()) if len(row) else 0.0
+    return limit, confidence
+
+
+def adaptive_thresholds(intensities, fallback=FIXED_THRESHOLD):
+    # read_regions sonucundan bölge adı -> (eşikler, güvenler). Metin bölgelerinde
+    # madde başına liste, seçim bölgelerinde tek değer döner.
+    parts = [np.concatenate(v) if isinstance(v, list) else v for v in intensities.values()]
+    threshold, blank, contrast = sheet_levels(np.concatenate(parts), fallback)
+
+    result = {}
+    for name, values in intensities.items():
+        if isinstance(values, list):
+            levels = [item_levels(row, threshold, blank, contrast) for row in values]
+            result[name] = ([limit for limit, _ in levels], [conf for _, conf in levels])
+        else:
+            result[name] = item_levels(values, threshold, blank, contrast)
+    return result
+
+
+def review_items(confidences, limit=REVIEW_CONFIDENCE):
+    # Güveni düşük maddeler "bölge:sıra" (1'den başlar) biçiminde
+    items = []
+    for name, conf in confidences.items():
+        for idx, value in enumerate(conf if isinstance(conf, list) else [conf]):
+            if value < limit:
+                items.append(f"{name}:{idx + 1}")
+    return items
+
+
+def decode_grid(intensities, threshold=80, verbose=False, labels=None):
+    # Her maddede tek işaret etiketine, çoklu işaret "M"ye, boş madde "X"e çevrilir.
+    # Etiket verilmezse 10 seçenekli maddeler rakam, diğerleri harf kabul edilir.
+    # Eşik tek değer ya da madde başına liste olabilir.
+    result = ""
+    for row_idx, row in enumerate(intensities):
+        limit = threshold[row_idx] if np.ndim(threshold) else threshold
+        marked = np.flatnonzero(row < limit)  # NaN değerler işaretsiz sayılır
+        if len(marked) > 1:
+            result += "M"  # Multiple marks indicator
+            if verbose:
+                print(f"Soru {row_idx + 1}: Birden fazla işaretleme tespit edildi")
+        elif len(marked) == 0:
+            result += "X"
+            if verbose:
+                print(f"Soru {row_idx + 1}: Boş")
+        else:
+            idx = int(marked[0])
+            if labels is not None:
+                marked_answer = labels[idx]
+            else:
+                marked_answer = str(idx) if len(row) == 10 else chr(65 + idx)
+            result += marked_answer
+            if verbose:
+                print(f"Soru {row_idx + 1}: {marked_answer}")
+    return result
+
+
+def decode_single(intensities, threshold=80):
+    marked = np.flatnonzero(np.asarray(intensities) < threshold)
+    if len(marked) > 1:
+        return -2  # Multiple marks indicator for non-grid
+    if len(marked) == 0:
+        return -1
+    return int(marked[0])
+
+
+def decode_region(layout, name, intensities, threshold=80, verbose=False):
+    # Bölgeyi şemadaki türüne göre çöz: metin bölgesi dizge, seçim bölgesi etiket döner
+    labels = layout.labels(name)
+    if layout.is_grid(name):
+        return decode_grid(intensities, threshold, verbose, labels)
+    idx = decode_single(intensities, threshold)
+    return labels[idx] if idx >= 0 else "Bilinmiyor"
+
+
+@profiled()
+def read_marked_circles(image, centers, threshold=80, is_grid=False, verbose=False):
+    # Tek bir bölgeyi okur; birden fazla bölge için read_regions tercih edilmeli
+    points, lengths = flatten_centers(centers, is_grid)
+    intensities = bubble_intensities(to_gray(image), points)
+    if is_grid:
+        return decode_grid(np.split(intensities, np.cumsum(lengths)[:-1]), threshold, verbose)
+    return decode_single(intensities, threshold)
+
+
+def check_answers(answers, group, answer_key_map):
+    if group not in answer_key_map or not answer_key_map[group]:
+        return 0, 0, len(answers)
+    answer_key = answer_key_map[group]
+    correct = 0
+    wrong = 0
+    blank = 0
+    for student_answer, correct_answer in zip(answers, answer_key):
+        if student_answer == "X":
+            blank += 1
+        elif student_answer == "M":
+            wrong += 1  # Multiple marks considered wrong
+        elif student_answer == correct_answer:
+            correct += 1
+        else:
+            wrong += 1
+    return correct, wrong, blank
@@ -0,0 +1,239 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import common_path  # noqa: F401
+from profiling import profiled
+
+# Tarayıcı toplu çıktıları: her sayfa ayrı bir form. Sayfalar "<dosya>#<sayfa no>"
+# (1'den başlayarak) biçiminde adlandırılır; bu ad sonuçlarda, ilerleme dosyasında
+# ve okuma önbelleğinde tek bir form gibi kullanılır.
+DOCUMENT_EXTENSIONS = (".tif", ".tiff", ".pdf")
+PAGE_SEPARATOR = "#"
+
+# Şablon boyutu bilinmediğinde PDF sayfalarının işlendiği çözünürlük
+PDF_DPI = 300
+
+# JPEG gibi biçimlerde çözme sırasında küçültme (1/2, 1/4, 1/8); çözülen görüntü
+# hiçbir zaman şablondan küçük olmaz
+REDUCTION_FACTORS = (8, 4, 2)
+
+_READ_FLAGS = {
+    (1, True): cv2.IMREAD_COLOR, (1, False): cv2.IMREAD_GRAYSCALE,
+    (2, True): cv2.IMREAD_REDUCED_COLOR_2, (2, False): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    (4, True): cv2.IMREAD_REDUCED_COLOR_4, (4, False): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    (8, True): cv2.IMREAD_REDUCED_COLOR_8, (8, False): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+# Renk bilgisi taşımayan PIL kipleri; bu sayfalar doğrudan gri okunur
+_GRAY_MODES = ("1", "L", "LA", "I", "I;16", "F")
+
+# Süreç başına açık tutulan en fazla belge; aynı belgenin ardışık sayfaları için
+# dosya her sayfada yeniden açılmaz
+MAX_OPEN_DOCUMENTS = 2
+
+_documents = OrderedDict()
+_document_digests = {}
+
+
+def is_document(path):
+    return path.lower().endswith(DOCUMENT_EXTENSIONS)
+
+
+def is_pdf(path):
+    return path.lower().endswith(".pdf")
+
+
+def page_ref(path, index):
+    return f"{path}{PAGE_SEPARATOR}{index + 1}"
+
+
+def split_ref(ref):
+    # "tarama.tif#12" -> ("tarama.tif", 11); sayfa belirtilmemişse (yol, None)
+    path, separator, page = ref.rpartition(PAGE_SEPARATOR)
+    if separator and page.isdigit() and int(page) > 0 and is_document(path):
+        return path, int(page) - 1
+    return ref, None
+
+
+def _import_fitz():
+    # PDF isteğe bağlıdır; PyMuPDF yalnızca PDF girişi için gerekir
+    try:
+        import fitz
+    except ImportError:
+        raise ValueError("PDF girişi için PyMuPDF (fitz) kurulu olmalıdır!")
+    return fitz
+
+
+def _open_document(path):
+    # Belgeyi süreç içi önbellekten al, yoksa aç (en eski açık belge kapatılır)
+    document = _documents.get(path)
+    if document is not None:
+        _documents.move_to_end(path)
+        return document
+    try:
+        document = _import_fitz().open(path) if is_pdf(path) else Image.open(path)
+    except (OSError, RuntimeError) as e:
+        raise ValueError(f"Belge açılamadı ({path}): {e}")
+    _documents[path] = document
+    while len(_documents) > MAX_OPEN_DOCUMENTS:
+        _documents.popitem(last=False)[1].close()
+    return document
+
+
+def _forget_documents():
+    # Çatallanan (fork) işçi süreç, ana sürecin açık dosyalarını paylaşmamalı: dosya
+    # konumu ortak olduğundan eşzamanlı okumalar birbirini bozar
+    _documents.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_documents)
+
+
+def page_count(path):
+    try:
+        if is_pdf(path):
+            with _import_fitz().open(path) as document:
+                return document.page_count
+        with Image.open(path) as document:
+            return getattr(document, "n_frames", 1)
+    except (OSError, RuntimeError) as e:
+        raise ValueError(f"Belge açılamadı ({path}): {e}")
+
+
+def expand_source(path):
+    # Çok sayfalı belgeleri sayfa adlarına açar; sayfalar tembel üretilir. Tek
+    # sayfalı TIFF olduğu gibi döner. Belge açılamazsa yol döner, hata okumada raporlanır.
+    if not is_document(path):
+        yield path
+        return
+    try:
+        count = page_count(path)
+    except ValueError:
+        yield path
+        return
+    if count == 1 and not is_pdf(path):
+        yield path
+        return
+    for index in range(count):
+        yield page_ref(path, index)
+
+
+def reduction_factor(size, target_size):
+    # Çözülen görüntüyü hedeften küçük yapmayan en büyük küçültme katsayısı
+    if size is None or target_size is None:
+        return 1
+    width, height = size
+    target_width, target_height = target_size
+    for factor in REDUCTION_FACTORS:
+        if -(-width // factor) >= target_width and -(-height // factor) >= target_height:
+            return factor
+    return 1
+
+
+def image_size(path):
+    # Yalnızca dosya başlığı okunur; PIL'in tanımadığı biçimlerde None
+    try:
+        with Image.open(path) as image:
+            return image.size
+    except OSError:
+        return None
+
+
+def _reduce(image, factor):
+    if factor == 1:
+        return image
+    height, width = image.shape[:2]
+    return cv2.resize(image, (-(-width // factor), -(-height // factor)), interpolation=cv2.INTER_AREA)
+
+
+def _read_file(path, target_size, color):
+    factor = reduction_factor(image_size(path), target_size)
+    image = cv2.imread(path, _READ_FLAGS[(factor, color)])
+    if image is None:
+        raise ValueError(f"Görüntü dosyaları yüklenemedi: {path}")
+    return image
+
+
+def _read_tiff_page(path, index, target_size, color):
+    document = _open_document(path)
+    try:
+        document.seek(index)
+    except EOFError:
+        raise ValueError(f"Sayfa bulunamadı: {page_ref(path, index)}")
+    keep_color = color and document.mode not in _GRAY_MODES
+    factor = reduction_factor(document.size, target_size)
+    page = np.asarray(document.convert("RGB" if keep_color else "L"))
+    if keep_color:
+        page = cv2.cvtColor(page, cv2.COLOR_RGB2BGR)
+    return _reduce(page, factor)
+
+
+def _read_pdf_page(path, index, target_size, color):
+    fitz = _import_fitz()
+    document = _open_document(path)
+    if index >= document.page_count:
+        raise ValueError(f"Sayfa bulunamadı: {page_ref(path, index)}")
+    page = document.load_page(index)
+    # Sayfa doğrudan şablon boyutunda (şablondan küçük olmayacak şekilde) işlenir
+    if target_size is not None:
+        zoom = max(target_size[0] / page.rect.width, target_size[1] / page.rect.height)
+    else:
+        zoom = PDF_DPI / 72.0
+    pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csRGB if color else fitz.csGRAY,
+                             alpha=False)
+    rows = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.stride)
+    image = rows[:, :pixmap.width * pixmap.n].reshape(pixmap.height, pixmap.width, pixmap.n)
+    return cv2.cvtColor(image, cv2.COLOR_RGB2BGR) if color else image[:, :, 0].copy()
+
+
+@profiled("imread")
+def load_sheet(ref, target_size=None, color=True):
+    # Formu okur. color=False ise doğrudan gri çözülür (hizalama yapılmayacaksa renk
+    # gerekmez). target_size (şablon boyutu) verilirse biçim izin verdiğinde görüntü
+    # çözme sırasında küçültülür. Renk bilgisi olmayan sayfalar her zaman gri döner.
+    path, index = split_ref(ref)
+    if index is None:
+        return _read_file(path, target_size, color)
+    if is_pdf(path):
+        return _read_pdf_page(path, index, target_size, color)
+    return _read_tiff_page(path, index, target_size, color)
+
+
+def iter_sheets(path, target_size=None, color=True):
+    # Belgenin sayfalarını sırayla okuyarak (sayfa adı, görüntü) üretir; aynı anda
+    # bellekte yalnızca bir sayfa bulunur
+    for ref in expand_source(path):
+        yield ref, load_sheet(ref, target_size, color)
+
+
+def document_digest(path):
+    # Belge içeriğinin özeti; parça parça okunur ve (yol, değişiklik zamanı, boyut)
+    # aynı kaldıkça tekrar hesaplanmaz
+    stat = os.stat(path)
+    stamp = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if stamp not in _document_digests:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        _document_digests[stamp] = digest.hexdigest()
+    return _document_digests[stamp]
+
+
+def source_key(cache, ref, *versions):
+    # Okuma önbelleği anahtarı: tek görüntüde dosya içeriği, belge sayfasında
+    # belge özeti + sayfa numarası. Dosya okunamazsa None.
+    path, index = split_ref(ref)
+    if index is None:
+        return cache.key_for_file(path, *versions)
+    try:
+        digest = document_digest(path)
+    except OSError:
+        return None
+    return cache.make_key(f"{digest}{PAGE_SEPARATOR}{index + 1}".encode("utf-8"), *versions)